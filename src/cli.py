@@ -0,0 +1,251 @@
+"""
+Sort spreadsheets without the GUI.
+
+Run from the src directory, or with src/cli.py from anywhere:
+
+    python cli.py table.tsv other.csv -o sorted
+    python cli.py data/general.json --collection photos --collection videos --jobs 4
+    python cli.py tables.json --solver cpsat --time-limit 30
+
+Inputs are read by extension:
+  .tsv / .csv   one table: the first row holds the roles of the columns, the second the
+                dependency patterns, the others the rows to sort
+  .json         a list of rows laid out as above, an object {"roles": [...], "table": [...]}
+                with the table starting at the patterns row, or an object mapping collection
+                names to such objects
+  general.json  the collections saved by the application (a pickle, whatever its extension)
+A row may be shorter than the row of roles, but not have values past it.
+
+Every collection is sorted in its own process. The sorted table is written to the output
+directory as <collection>.<tsv|csv|json>, and the errors and warnings, if any, to
+<collection>.report.txt.
+
+Exit codes: 0 if every collection was sorted, 1 if at least one could not be (see its
+report), 2 for invalid arguments or files that cannot be read or written.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import pickle
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from models.generate_sortings import order_table, sort_order
+from models.solver_stats import SolverStats
+
+EXIT_OK = 0
+EXIT_SORT_ERRORS = 1
+EXIT_USAGE = 2
+
+DELIMITERS = {".tsv": "\t", ".csv": ","}
+
+
+class InputError(Exception):
+    """An input file that cannot be read or does not hold tables."""
+
+
+def _pad(rows: List[List[str]], width: int, source: str) -> List[List[str]]:
+    """
+    Rows as strings, padded to `width` cells. Empty cells past `width` are dropped;
+    raises InputError for a row with values past it, which has no role.
+    """
+    padded = []
+    for i, row in enumerate(rows):
+        row = [str(cell) for cell in row]
+        if any(row[width:]):
+            raise InputError(f"{source}: row {i + 1} of the table has {len(row)} cells but there are {width} roles")
+        padded.append(row[:width] + [""] * (width - len(row)))
+    return padded
+
+
+def _split_roles(rows: List[List[str]], source: str) -> Tuple[List[str], List[List[str]]]:
+    """Roles (first row) and table (the others) of a table laid out as in a TSV file."""
+    if len(rows) < 2:
+        raise InputError(f"{source}: expected a row of roles and a row of dependency patterns")
+    roles = [str(role).strip() for role in rows[0]]
+    return roles, _pad(rows[1:], len(roles), source)
+
+
+def _json_collection(value, source: str) -> Tuple[List[str], List[List[str]]]:
+    if isinstance(value, list):
+        return _split_roles(value, source)
+    if isinstance(value, dict) and "roles" in value and "table" in value:
+        roles = [str(role) for role in value["roles"]]
+        if not value["table"]:
+            raise InputError(f"{source}: expected a row of dependency patterns")
+        return roles, _pad(value["table"], len(roles), source)
+    raise InputError(f"{source}: expected a list of rows or an object with 'roles' and 'table'")
+
+
+def read_collections(path: str) -> Tuple[Dict[str, Tuple[List[str], List[List[str]]]], str]:
+    """
+    Collections of an input file by name, each as (roles, table) with the dependency
+    patterns as first row of the table, and the format to write the results in.
+    Raises InputError if the file cannot be read.
+    """
+    file = Path(path)
+    try:
+        raw = file.read_bytes()
+    except OSError as e:
+        raise InputError(f"{path}: {e.strerror}") from e
+
+    # The application saves its collections with pickle, under a .json name
+    if raw[:1] == b"\x80":
+        try:
+            saved = pickle.loads(raw)
+        except Exception as e:
+            raise InputError(f"{path}: cannot load saved collections: {e}") from e
+        collections = {}
+        for name, element in saved.collections.items():
+            # As in the background tasks, the first row of the data is not part of the table
+            if len(element.data) < 2:
+                continue
+            collections[name] = (list(element.roles), _pad(element.data.rows(1), len(element.roles), f"{path} [{name!r}]"))
+        return collections, "tsv"
+
+    suffix = file.suffix.lower()
+    try:
+        text = raw.decode("utf-8-sig")
+    except UnicodeDecodeError as e:
+        raise InputError(f"{path}: not UTF-8 text") from e
+    if suffix in DELIMITERS:
+        rows = list(csv.reader(io.StringIO(text, newline=""), delimiter=DELIMITERS[suffix]))
+        return {file.stem: _split_roles(rows, path)}, suffix[1:]
+    if suffix == ".json":
+        try:
+            value = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise InputError(f"{path}: invalid JSON: {e}") from e
+        if isinstance(value, dict) and not ("roles" in value and "table" in value):
+            return {str(name): _json_collection(item, f"{path} [{name!r}]") for name, item in value.items()}, "json"
+        return {file.stem: _json_collection(value, path)}, "json"
+    raise InputError(f"{path}: unknown format {suffix!r}, expected .tsv, .csv or .json")
+
+
+def write_table(path: Path, roles: List[str], table: List[List[str]], fmt: str):
+    if fmt == "json":
+        path.write_text(json.dumps({"roles": roles, "table": table}, ensure_ascii=False, indent=1), encoding="utf-8")
+        return
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        csv.writer(f, delimiter=DELIMITERS[f".{fmt}"], lineterminator="\n").writerows([roles] + table)
+
+
+def write_report(path: Path, errors: List[str], warnings: List[str]):
+    lines = []
+    if errors:
+        lines += ["Errors found:"] + [f"- {error}" for error in errors]
+    if warnings:
+        lines += ["Warnings found:"] + [f"- {warning}" for warning in warnings]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def sort_collection(roles: List[str], table: List[List[str]], solve_options: dict) -> Tuple[List[List[str]], List[str], List[str], dict]:
+    """
+    Sort one table in a worker process, as the sorting thread of the application does.
+    Returns the sorted table (None if there are errors), the errors, the warnings and the solver stats.
+    An unexpected exception is returned as an error of the table, so that the other
+    collections of the batch are still written.
+    """
+    errors = []
+    warnings = []
+    stats = SolverStats()
+    try:
+        # sort_order fills in inherited paths, which are not written back
+        res = sort_order([list(row) for row in table], roles, errors, warnings, stats, solve_options)
+        if res is None:
+            return None, errors or ["No valid solution found!"], warnings, stats.to_dict()
+        with stats.phase("order_table"):
+            new_table = order_table(res, table, roles, [cell.split('.') for cell in table[0]])
+    except Exception as e:
+        return None, errors + [f"Error when sorting: {e!r}"], warnings, stats.to_dict()
+    return new_table, errors, warnings, stats.to_dict()
+
+
+def _file_name(name: str) -> str:
+    return "".join(c if c.isalnum() or c in "-_. " else "_" for c in name).strip() or "collection"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Sort spreadsheet collections without the GUI.")
+    parser.add_argument("inputs", nargs="+", help="TSV, CSV or JSON tables, or a general.json saved by the application")
+    parser.add_argument("-o", "--output-dir", default="sorted", help="directory of the sorted tables and reports")
+    parser.add_argument("-c", "--collection", action="append", help="only sort this collection (repeatable)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="collections sorted in parallel")
+    parser.add_argument("--solver", default="backtracking", choices=["backtracking", "propagation", "cpsat"])
+    parser.add_argument("--optimizer", default="hill_climbing", choices=["hill_climbing", "annealing"])
+    parser.add_argument("--max-iterations", type=int, default=2000, help="swaps tried by hill climbing")
+    parser.add_argument("--time-limit", type=float, default=10.0, help="seconds per solve")
+    parser.add_argument("--stats", action="store_true", help="also write the solver stats to <collection>.stats.json")
+    args = parser.parse_args(argv)
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+
+    jobs = {}
+    for path in args.inputs:
+        try:
+            collections, fmt = read_collections(path)
+        except InputError as e:
+            print(f"error: {e}", file=sys.stderr)
+            return EXIT_USAGE
+        for name, (roles, table) in collections.items():
+            if args.collection and name not in args.collection:
+                continue
+            if name in jobs:
+                print(f"error: collection {name!r} found in several inputs", file=sys.stderr)
+                return EXIT_USAGE
+            jobs[name] = (roles, table, fmt)
+    missing = [name for name in args.collection or [] if name not in jobs]
+    if missing:
+        print(f"error: no collection named {', '.join(map(repr, missing))}", file=sys.stderr)
+        return EXIT_USAGE
+    if not jobs:
+        print("error: no collection to sort", file=sys.stderr)
+        return EXIT_USAGE
+
+    output_dir = Path(args.output_dir)
+    try:
+        output_dir.mkdir(parents=True, exist_ok=True)
+    except OSError as e:
+        print(f"error: {output_dir}: {e.strerror}", file=sys.stderr)
+        return EXIT_USAGE
+
+    solve_options = {
+        "solver": args.solver,
+        "optimizer": args.optimizer,
+        "max_iterations": args.max_iterations,
+        "time_limit": args.time_limit,
+    }
+    exit_code = EXIT_OK
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=min(args.jobs, len(jobs))) as executor:
+        futures = {name: executor.submit(sort_collection, roles, table, solve_options) for name, (roles, table, _) in jobs.items()}
+        for name, future in futures.items():
+            roles, table, fmt = jobs[name]
+            base = output_dir / _file_name(name)
+            new_table, errors, warnings, stats = future.result()
+            try:
+                if errors or warnings:
+                    write_report(base.with_name(base.name + ".report.txt"), errors, warnings)
+                if not errors:
+                    write_table(base.with_name(f"{base.name}.{fmt}"), roles, new_table, fmt)
+                if args.stats:
+                    base.with_name(base.name + ".stats.json").write_text(json.dumps(stats, indent=2), encoding="utf-8")
+            except OSError as e:
+                print(f"error: {e.filename}: {e.strerror}", file=sys.stderr)
+                return EXIT_USAGE
+            if errors:
+                exit_code = EXIT_SORT_ERRORS
+                print(f"{name}: {len(errors)} error(s), see {base.name}.report.txt", file=sys.stderr)
+            else:
+                print(f"{name}: sorted {len(table) - 1} rows" + (f", {len(warnings)} warning(s)" if warnings else ""))
+    print(f"{len(jobs)} collection(s) in {time.perf_counter() - start:.1f}s")
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,25 +1,59 @@
 import asyncio
 import random
-import re
 import threading
+from collections import defaultdict
+
+# Validated tables, constraints and solutions of the collections, kept across restarts
+SOLUTION_CACHE_FILE = "data/solutions.pickle"
 
 
 def checkings_thread(self):
-    global find_valid_sortings
-    from models.generate_sortings import find_valid_sortings
+    global find_valid_sortings, order_table, SortSession, SortCancelled, SolverStats
+    from models.generate_sortings import find_valid_sortings, order_table, SortSession, SortCancelled
+    from models.solver_stats import SolverStats
+    from models.solution_cache import SolutionCache
+    # Shared with the sorting thread, so that sorting right after a check reuses its work
+    self.solution_cache = SolutionCache(path=SOLUTION_CACHE_FILE)
     self.imports_loaded.set()
+    # Parsed rows and last order of each collection, so that re-checking after an edit is incremental
+    sessions = defaultdict(SortSession)
     firstIteration = True
     while True:
         with self.condition:
             if not firstIteration:
-                del self.checkings_list[0]
+                del self._cancel_tokens[self.checkings_list.pop(0)["id"]]
             firstIteration = False
             while not self.checkings_list:
                 self.condition.wait()
             task = self.checkings_list[0]
-        data = self.collections[task["collectionName"]].data[1:]
-        roles = self.collections[task["collectionName"]].roles
-        res = find_valid_sortings(data, roles)
+            # Set by the model when a newer check of the same collection is queued
+            cancel = self._cancel_tokens[task["id"]] = threading.Event()
+            collectionName = task["collectionName"]
+            data = self.collections[collectionName].data.rows(1)
+            roles = list(self.collections[collectionName].roles)
+        found_errors = []
+
+        def on_issue(issue):
+            if cancel.is_set():
+                return
+            # Rows of the checked table start after the roles row of the collection
+            value = issue._asdict()
+            if value["row"] is not None:
+                value["row"] += 1
+            self.signal.emit({"type": "validation_issue", "collectionName": collectionName, "value": value})
+            if issue.level == "error":
+                found_errors.append(issue.message)
+                self._errorMsg = "\n".join(found_errors)
+                self.signal.emit({"type": "FloatingWindow_text_changed", "value": self._errorMsg})
+
+        # Checking only needs a valid order, not an optimized one
+        try:
+            res = find_valid_sortings(data, roles, session=sessions[collectionName], solve_options={"max_iterations": 0},
+                                      on_issue=on_issue, cancel=cancel, cache=self.solution_cache)
+        except SortCancelled:
+            continue
+        if cancel.is_set():
+            continue
         if type(res) is str:
             self._errorMsg = res
             self.signal.emit({"type": "FloatingWindow_text_changed", "value": res})
@@ -30,22 +64,35 @@ def checkings_thread(self):
 
 def sortings_thread(self):
     self.imports_loaded.wait()
+    sessions = defaultdict(SortSession)
     firstIteration = True
     while True:
         with self.condition:
             if not firstIteration:
-                del self.sortings_list[0]
+                del self._cancel_tokens[self.sortings_list.pop(0)["id"]]
             firstIteration = False
             while not self.sortings_list:
                 self.condition.wait()
             task = self.sortings_list[0]
             collectionName = task["collectionName"]
-            task_id = task["id"]
-        data = self.collections[collectionName].data[1:]
-        roles = self.collections[collectionName].roles
-        res = find_valid_sortings(data, roles)
+            # Set by the model when a newer sort of the same collection is queued
+            cancel = self._cancel_tokens[task["id"]] = threading.Event()
+            element = self.collections[collectionName]
+            data = element.data.rows(1)
+            roles = list(element.roles)
+            version = element.data.version
+        stats = SolverStats(hook=lambda stats: self.signal.emit({"type": "solver_stats", "collectionName": collectionName, "value": stats.to_dict()}))
+        # The order of a table this thread already sorted is kept, so sorting twice does not reshuffle the rows
+        try:
+            res = find_valid_sortings(data, roles, stats, sessions[collectionName], {"keep_valid_initial": True}, cancel=cancel,
+                                      cache=self.solution_cache)
+        except SortCancelled:
+            continue
         with self._data_lock:
-            if self.sortings_list[0]["id"] != task_id:
+            # The result is for the rows the sort was given: writing it back would undo the
+            # edits made since, which cancel the sort but may arrive after it finished
+            if (cancel.is_set() or self.collections.get(collectionName) is not element
+                    or element.data.version != version or element.roles != roles):
                 continue
             if type(res) is str:
                 for e in self._errorMsg:
@@ -59,24 +106,20 @@ def sortings_thread(self):
                 new_errorMsg = filter(lambda x: x[0] != collectionName, self._errorMsg)
                 if new_errorMsg != self._errorMsg:
                     self.signal.emit({"type": "FloatingWindow_text_changed", "value": "\n".join([" : ".join(e) for e in self._errorMsg])})
-                if task["reorder"] and res[0] != list(range(len(data))):
-                    self.beginResetModel()
-                    self._data[1:] = [data[i] for i in res[0]]
-                    for r in self._data[1:]:
-                        for colInd, c in enumerate(r):
-                            if roles[colInd] != 'dependencies':
-                                continue
-                            r[colInd] = re.sub(
-                                r'(after\s+|as far as possible from\s+)([1-9][0-9]*)(?=;|$)',
-                                lambda m: m.group(1) + str(res[0].index(int(m.group(2)) - 1) + 1),
-                                c
-                            )
-                    for i in range(len(self._data) - 1, -1, -1):
-                        if self._data[i] == [""] * len(self._data[0]):
-                            self._data.pop(i)
-                            self._rowHeights.pop(i)
-                    self.verticalScroll(self._verticalScrollPosition, self._verticalScrollSize, self._tableViewContentY, self._tableViewHeight)
-                    self.endResetModel()
+                if task["reorder"] and res[0] == list(range(len(data))):
+                    sessions[collectionName].mark_optimized(data, roles)
+                elif task["reorder"]:
+                    # The collection may not be the one shown anymore
+                    shown = element is self._collection
+                    if shown:
+                        self.beginResetModel()
+                    element.data.set_rows(1, order_table(res[0], data, roles, [cell.split('.') for cell in data[0]]))
+                    for i in element.data.remove_empty_rows():
+                        element.rowHeights.pop(i)
+                    sessions[collectionName].mark_optimized(element.data.rows(1), roles)
+                    if shown:
+                        self.verticalScroll(self._verticalScrollPosition, self._verticalScrollSize, self._tableViewContentY, self._tableViewHeight)
+                        self.endResetModel()
                     self.save_to_file()
 
 
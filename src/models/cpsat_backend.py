@@ -0,0 +1,113 @@
+import itertools
+import threading
+from typing import List, Optional, Tuple
+
+from ortools.sat.python import cp_model
+
+from .generate_sortings import SortCancelled, _check_cancelled
+
+# Building the model polls the cancellation token once every CHECK_INTERVAL constraints
+CHECK_INTERVAL = 4096
+
+
+def _allowed_domain(intervals: List[Tuple[float, float]], n: int) -> cp_model.Domain:
+    """Relative positions reachable in an arrangement of n elements that fall outside the forbidden intervals."""
+    bound = n - 1
+    forbidden = []
+    for start, end in intervals:
+        start = max(start, -bound)
+        end = min(end, bound)
+        if start <= end:
+            forbidden.append([int(start), int(end)])
+    return cp_model.Domain.from_intervals(forbidden).complement().intersection_with(cp_model.Domain(-bound, bound))
+
+
+def solve_cpsat(sorter, workers: int = 8, time_limit: float = 10.0, hint: Optional[List[int]] = None) -> Optional[List[int]]:
+    """
+    Solve the constraints collected by a ConstraintSorter with CP-SAT.
+    Every element gets an integer position variable, forbidden intervals become domain
+    constraints on position differences, disjunctive constraints a Boolean OR over the
+    candidate elements, and the maximize-distance pairs and groups the objective.
+    `hint` is an arrangement of element ids to start the search from. The search stops
+    with SortCancelled when the cancellation token of the sorter is set.
+    Returns the element ids of the best arrangement found within `time_limit` seconds, or None.
+    """
+    n = sorter.n
+    if n == 0:
+        return []
+    model = cp_model.CpModel()
+    pos = [model.new_int_var(0, n - 1, f"pos_{i}") for i in range(n)]
+    model.add_all_different(pos)
+    if hint is not None:
+        for i, elem in enumerate(hint):
+            model.add_hint(pos[elem], i)
+
+    for k, (x, y, intervals) in enumerate(sorter.forbidden_constraints):
+        if k % CHECK_INTERVAL == 0:
+            _check_cancelled(sorter.cancel)
+        if x == y:
+            if sorter._in_intervals(0, intervals):
+                return None
+            continue
+        model.add_linear_expression_in_domain(pos[x] - pos[y], _allowed_domain(intervals, n))
+
+    for k, (x, y_list, intervals) in enumerate(sorter.required_disjunctive_constraints):
+        if k % CHECK_INTERVAL == 0:
+            _check_cancelled(sorter.cancel)
+        if not y_list:
+            continue
+        allowed = _allowed_domain(intervals, n)
+        literals = []
+        for y in y_list:
+            if y == x:
+                if not sorter._in_intervals(0, intervals):
+                    break
+                continue
+            literal = model.new_bool_var("")
+            model.add_linear_expression_in_domain(pos[x] - pos[y], allowed).only_enforce_if(literal)
+            literals.append(literal)
+        else:
+            model.add_bool_or(literals)
+
+    distances = []
+    # The model needs one distance variable per pair, so maximize groups are expanded into their pairs
+    group_pairs = itertools.chain.from_iterable(itertools.combinations(group, 2) for group in sorter.maximize_groups)
+    for k, (x, y) in enumerate(itertools.chain(sorter.maximize_distance, group_pairs)):
+        if k % CHECK_INTERVAL == 0:
+            _check_cancelled(sorter.cancel)
+        if x == y:
+            continue
+        distance = model.new_int_var(0, n - 1, "")
+        model.add_abs_equality(distance, pos[x] - pos[y])
+        distances.append(distance)
+    if distances:
+        model.maximize(sum(distances))
+
+    solver = cp_model.CpSolver()
+    solver.parameters.num_workers = workers
+    solver.parameters.max_time_in_seconds = time_limit
+    if sorter.cancel is not None:
+        # CP-SAT does not poll anything itself, so a watcher stops it once the job is cancelled
+        done = threading.Event()
+
+        def watch():
+            while not done.wait(0.05):
+                if sorter.cancel.is_set():
+                    solver.stop_search()
+                    return
+
+        watcher = threading.Thread(target=watch, daemon=True)
+        watcher.start()
+    try:
+        status = solver.solve(model)
+    finally:
+        if sorter.cancel is not None:
+            done.set()
+            watcher.join()
+    sorter.stats.nodes += solver.num_branches
+    sorter.stats.backtracks += solver.num_conflicts
+    if sorter.cancel is not None and sorter.cancel.is_set():
+        raise SortCancelled()
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return None
+    return sorted(range(n), key=lambda elem: solver.value(pos[elem]))
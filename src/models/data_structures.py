@@ -1,4 +1,8 @@
 import random
+import sys
+from array import array
+from bisect import bisect_left
+from typing import List, Optional
 
 class RoleTypes:
     NAMES = "names"
@@ -8,13 +12,162 @@ class RoleTypes:
     POINTERS = "pointers"
     PATH = "path"
 
+class CellStore:
+    """
+    Cells of a collection, stored by column. Each column is a list of interned strings that
+    stops at its last non-empty cell, so empty columns and the empty ends of columns take no
+    room, and adding or removing a column does not touch the other ones. The non-empty cells
+    of every row and column are counted, to find the empty ones without scanning the cells.
+    len() is the number of rows; a store without rows has no columns either, as a list of rows.
+    `version` changes with every edit, so that a copy of the rows can be checked to be current.
+    """
+    __slots__ = ("_columns", "_column_filled", "_row_filled", "version")
+
+    def __init__(self, rows: Optional[List[List[str]]] = None):
+        self._columns: List[List[str]] = []
+        self._column_filled: List[int] = []
+        self._row_filled = array("I")
+        self.version = 0
+        if rows:
+            self.add_columns(max(len(row) for row in rows))
+            self.set_rows(0, rows)
+
+    def __len__(self):
+        return len(self._row_filled)
+
+    @property
+    def column_count(self) -> int:
+        return len(self._columns)
+
+    def get(self, row: int, col: int) -> str:
+        """Value of a cell, "" outside of the store."""
+        if row < 0 or not 0 <= col < len(self._columns):
+            return ""
+        column = self._columns[col]
+        return column[row] if row < len(column) else ""
+
+    def set(self, row: int, col: int, value: str):
+        if not (0 <= row < len(self._row_filled) and 0 <= col < len(self._columns)):
+            raise IndexError(f"cell ({row}, {col}) outside of a {len(self._row_filled)}x{len(self._columns)} store")
+        self.version += 1
+        column = self._columns[col]
+        filled = row < len(column) and column[row] != ""
+        if value:
+            if row >= len(column):
+                column.extend([""] * (row + 1 - len(column)))
+            column[row] = sys.intern(value)
+            if not filled:
+                self._column_filled[col] += 1
+                self._row_filled[row] += 1
+        elif filled:
+            column[row] = ""
+            self._column_filled[col] -= 1
+            self._row_filled[row] -= 1
+            while column and not column[-1]:
+                column.pop()
+
+    def rows(self, start: int = 0, stop: Optional[int] = None) -> List[List[str]]:
+        """Rows `start` to `stop` as lists of column_count values."""
+        stop = len(self._row_filled) if stop is None else min(stop, len(self._row_filled))
+        table = [[""] * len(self._columns) for _ in range(start, stop)]
+        for j, column in enumerate(self._columns):
+            for row, value in zip(table, column[start:stop]):
+                if value:
+                    row[j] = value
+        return table
+
+    def set_rows(self, start: int, rows: List[List[str]]):
+        """Replace the rows from `start` on by `rows`, whose values past column_count are dropped."""
+        self.version += 1
+        del self._row_filled[start:]
+        self._row_filled.extend([0] * (start - len(self._row_filled) + len(rows)))
+        for j, column in enumerate(self._columns):
+            self._column_filled[j] -= sum(1 for value in column[start:] if value)
+            del column[start:]
+            column.extend([""] * (start - len(column)))
+            for i, row in enumerate(rows, start):
+                value = row[j] if j < len(row) else ""
+                if value:
+                    self._column_filled[j] += 1
+                    self._row_filled[i] += 1
+                    value = sys.intern(value)
+                column.append(value)
+            while column and not column[-1]:
+                column.pop()
+        if not self._row_filled:
+            self._columns = []
+            self._column_filled = []
+
+    def add_rows(self, count: int):
+        self.version += 1
+        self._row_filled.extend([0] * count)
+
+    def add_columns(self, count: int):
+        self.version += 1
+        for _ in range(count):
+            self._columns.append([])
+            self._column_filled.append(0)
+
+    def is_row_empty(self, row: int) -> bool:
+        return not self._row_filled[row]
+
+    def is_column_empty(self, col: int) -> bool:
+        return not self._column_filled[col]
+
+    def remove_empty_rows(self) -> List[int]:
+        """Remove the rows without values and return their indexes, last first."""
+        removed = [i for i, filled in enumerate(self._row_filled) if not filled]
+        if removed:
+            self.version += 1
+            kept = [i for i, filled in enumerate(self._row_filled) if filled]
+            # The last value of a column is in a kept row, so the columns stay trimmed
+            self._columns = [[column[i] for i in kept[:bisect_left(kept, len(column))]] for column in self._columns]
+            self._row_filled = array("I", (filled for filled in self._row_filled if filled))
+            if not self._row_filled:
+                self._columns = []
+                self._column_filled = []
+        return removed[::-1]
+
+    def remove_empty_columns(self) -> List[int]:
+        """Remove the columns without values and return their indexes, last first."""
+        removed = [j for j, filled in enumerate(self._column_filled) if not filled][::-1]
+        if removed:
+            self.version += 1
+        for j in removed:
+            self._columns.pop(j)
+            self._column_filled.pop(j)
+        return removed
+
+    def __getstate__(self):
+        return {"columns": self._columns, "row_count": len(self._row_filled)}
+
+    def __setstate__(self, state):
+        self._columns = []
+        self._column_filled = []
+        self._row_filled = array("I", [0] * state["row_count"])
+        self.version = 0
+        # Interned strings are not shared anymore once unpickled
+        for column in state["columns"]:
+            self._columns.append([sys.intern(value) if value else "" for value in column])
+            self._column_filled.append(0)
+            for i, value in enumerate(column):
+                if value:
+                    self._column_filled[-1] += 1
+                    self._row_filled[i] += 1
+
 class collectionElement:
     def __init__(self, rowHeights, columnWidths):
-        self.data = [["names"]]
+        self.data = CellStore([["names"]])
         self.roles = ["names"]
         self.rowHeights = rowHeights
         self.columnWidths = columnWidths
 
+    def __setstate__(self, state):
+        # Collections saved before the cells were stored by column hold a list of rows
+        if isinstance(state.get("data"), list):
+            state["data"] = CellStore(state["data"])
+        self.__dict__.update(state)
+
 class collection:
     def __init__(self):
         self.collections = {}
@@ -0,0 +1,137 @@
+import re
+from functools import lru_cache
+from typing import List, NamedTuple, Optional, Tuple
+
+PATTERN_DISTANCE = r'^(?P<prefix>as far as possible from )(?P<any>any)?((?P<number>\d+)|(?P<name>.+))(?P<suffix>)$'
+PATTERN_AREAS = r'^(?P<prefix>.*\|)(?P<any>any)?((?P<number>\d+)|(?P<name>.+))(?P<suffix>\|.*)$'
+_DISTANCE_RE = re.compile(PATTERN_DISTANCE)
+_AREAS_RE = re.compile(PATTERN_AREAS)
+
+class instr_struct:
+    def __init__(self, instr_type: int, any: bool, numbers: List[int], intervals: List[Tuple[int, int]] = None):
+        self.instr_type = instr_type
+        self.any = any
+        self.numbers = numbers
+        self.intervals = intervals
+
+    def __eq__(self, other):
+        if not isinstance(other, instr_struct):
+            return False
+        return (self.instr_type == other.instr_type and
+                self.any == other.any and
+                sorted(self.numbers) == sorted(other.numbers) and
+                sorted(self.intervals) == sorted(other.intervals))
+
+    def __hash__(self):
+        return hash((
+            self.instr_type,
+            self.any,
+            tuple(sorted(self.numbers)),
+            tuple(sorted(self.intervals))
+        ))
+
+def get_intervals(interval_str):
+    # First, parse the positions of intervals
+    intervals = [[], []]
+    neg_pos = interval_str.split('|')
+    positive = 0
+    for neg_pos_part in [neg_pos[0], neg_pos[2]]:
+        parts = re.split(r'_', neg_pos_part)
+        for part in parts:
+            if not part:
+                intervals[positive].append((None, None))
+            elif ":" in part:
+                start, end = part.split(':')
+                try:
+                    start = int(start)
+                except:
+                    start = float('inf')
+                try:
+                    end = int(end)
+                except:
+                    end = float('inf')
+                if not positive:
+                    start = -start
+                    end = -end
+                intervals[positive].append((start, end))
+            else:
+                intervals[positive].append((int(part), int(part)))
+        positive = 1
+
+    # Now calculate underscore intervals
+    result = []
+    positive = 0
+    for neg_pos_part in intervals:
+        for i in range(len(neg_pos_part) - 1):
+            end_of_current = neg_pos_part[i][1]
+            start_of_next = neg_pos_part[i+1][0]
+            if end_of_current is None:
+                if not positive:
+                    end_of_current = -float('inf')
+                elif result and result[-1][1] == -1:
+                    end_of_current = result[-1][0] - 1
+                    del result[-1]
+                else:
+                    end_of_current = 0
+            if start_of_next is None:
+                if not positive:
+                    start_of_next = 0
+                else:
+                    start_of_next = float('inf')
+            if start_of_next - end_of_current <= 1:
+                raise ValueError("Invalid interval: overlapping or adjacent intervals found.")
+            result.append((end_of_current + 1, start_of_next - 1))
+        positive = 1
+    
+    return result
+
+class ParsedInstruction(NamedTuple):
+    """
+    One dependency instruction, expanded with its column pattern. `number` or `name` is the
+    target as written, and `number_span` the position of the number in `instruction`.
+    Instances are shared through the parse cache and must not be modified.
+    """
+    instruction: str
+    instr_type: bool
+    any: bool
+    number: Optional[int]
+    name: Optional[str]
+    number_span: Optional[Tuple[int, int]]
+    intervals: Tuple[Tuple[float, float], ...]
+
+def expand_instruction(pattern: Tuple[str, ...], instr: str) -> str:
+    """
+    Insert the dot-separated parts of a cell instruction into the dependency pattern of its
+    column (the header cell split on dots). Raises ValueError if the counts do not match.
+    """
+    instr_split = instr.split('.')
+    if len(instr_split) != len(pattern) - 1:
+        raise ValueError(f"{instr!r} does not match dependencies pattern {list(pattern)!r}")
+    return pattern[0] + ''.join([instr_split[i] + pattern[i + 1] for i in range(len(instr_split))])
+
+@lru_cache(maxsize=1 << 16)
+def parse_instruction(pattern: Tuple[str, ...], instr: str) -> ParsedInstruction:
+    """
+    Parse a cell instruction of a dependencies column with pattern `pattern`.
+    Results are cached, so the instructions repeated across rows and re-sorts of an
+    unchanged table are parsed once. Raises ValueError with the reason if the
+    instruction is malformed.
+    """
+    instruction = expand_instruction(pattern, instr)
+    match = _DISTANCE_RE.match(instruction)
+    intervals = ()
+    if instr_type := not match:
+        match = _AREAS_RE.match(instruction)
+        if not match:
+            raise ValueError(f"{instruction!r} does not match expected format")
+        intervals = tuple(get_intervals(instruction))
+    number = match.group("number")
+    return ParsedInstruction(
+        instruction,
+        instr_type,
+        bool(match.group("any")),
+        int(number) if number else None,
+        match.group("name"),
+        match.span("number") if number else None,
+        intervals,
+    )
@@ -1,43 +1,182 @@
 import re
 import random
-from typing import List, Tuple, Set, Optional, Dict
+import math
+import time
+from typing import List, Tuple, Set, FrozenSet, Optional, Dict, Iterable, Callable, NamedTuple
+from functools import lru_cache
 import itertools
 import string
+from concurrent.futures import ProcessPoolExecutor, wait
+import multiprocessing
+import numpy as np
 
-PATTERN_DISTANCE = r'^(?P<prefix>as far as possible from )(?P<any>any)?((?P<number>\d+)|(?P<name>.+))(?P<suffix>)$'
-PATTERN_AREAS = r'^(?P<prefix>.*\|)(?P<any>any)?((?P<number>\d+)|(?P<name>.+))(?P<suffix>\|.*)$'
-
-class instr_struct:
-    def __init__(self, instr_type: int, any: bool, numbers: List[int], intervals: List[Tuple[int, int]] = None):
-        self.instr_type = instr_type
-        self.any = any
-        self.numbers = numbers
-        self.intervals = intervals
-
-    def __eq__(self, other):
-        if not isinstance(other, instr_struct):
-            return False
-        return (self.instr_type == other.instr_type and
-                self.any == other.any and
-                sorted(self.numbers) == sorted(other.numbers) and
-                sorted(self.intervals) == sorted(other.intervals))
-
-    def __hash__(self):
-        return hash((
-            self.instr_type,
-            self.any,
-            tuple(sorted(self.numbers)),
-            tuple(sorted(self.intervals))
-        ))
+from .dependency_parser import PATTERN_DISTANCE, PATTERN_AREAS, instr_struct, get_intervals, parse_instruction
+from .solver_stats import SolverStats
+from .solution_cache import SolutionCache, CachedSolution, table_fingerprint
+
+# Element id used in position lists for elements that are not placed yet
+UNPLACED = -1
+
+class SearchLimitReached(Exception):
+    """Raised by the search when its node or time limit is exhausted."""
+
+class SortCancelled(Exception):
+    """Raised when the cancellation token of a sorting job is set, at the next checkpoint."""
+
+def _check_cancelled(cancel):
+    """Raise SortCancelled if `cancel` (a threading or multiprocessing Event, or None) is set."""
+    if cancel is not None and cancel.is_set():
+        raise SortCancelled()
+
+class _SearchLimits:
+    """Node and time budget of one search, with the optional progress callback and cancellation token."""
+    # Time, progress, cancellation and node checks happen once every CHECK_INTERVAL nodes
+    CHECK_INTERVAL = 1024
+
+    def __init__(self, time_limit: Optional[float] = None, node_limit: Optional[int] = None,
+                 progress: Optional[Callable[[int, int], None]] = None, cancel=None):
+        self.deadline = time.perf_counter() + time_limit if time_limit is not None else None
+        self.node_limit = node_limit
+        self.progress = progress
+        self.cancel = cancel
+        self.nodes = 0
+        self.backtracks = 0
+
+    def count_node(self, depth: int):
+        """Account for one placement attempt with `depth` elements already placed."""
+        self.nodes += 1
+        if self.nodes % self.CHECK_INTERVAL:
+            return
+        if self.progress is not None:
+            self.progress(self.nodes, depth)
+        _check_cancelled(self.cancel)
+        if self.node_limit is not None and self.nodes >= self.node_limit:
+            raise SearchLimitReached(f"node limit of {self.node_limit} reached")
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise SearchLimitReached("time limit reached")
+
+class _PackedConstraints:
+    """
+    Constraints of a ConstraintSorter flattened into NumPy arrays for evaluating
+    whole arrangements at once: one row per (constraint, interval) for forbidden
+    constraints, one row per (constraint, y, interval) for disjunctive ones.
+    """
+    def __init__(self, sorter: "ConstraintSorter"):
+        fx, fy, f_lo, f_hi = [], [], [], []
+        for x, y, intervals in sorter.forbidden_constraints:
+            for start, end in intervals:
+                fx.append(x)
+                fy.append(y)
+                f_lo.append(start)
+                f_hi.append(end)
+        self.fx = np.array(fx, dtype=np.intp)
+        self.fy = np.array(fy, dtype=np.intp)
+        self.f_lo = np.array(f_lo, dtype=np.float64)
+        self.f_hi = np.array(f_hi, dtype=np.float64)
+
+        # Rows of a (constraint, y) pair are contiguous, and so are the pairs of a
+        # constraint, so both reductions are a reduceat over start offsets.
+        dx, dy, d_lo, d_hi = [], [], [], []
+        pair_starts, constraint_starts = [], []
+        for x, y_list, intervals in sorter.required_disjunctive_constraints:
+            # Without candidates or intervals the constraint can never be violated
+            if not y_list or not intervals:
+                continue
+            constraint_starts.append(len(pair_starts))
+            for y in y_list:
+                pair_starts.append(len(dx))
+                for start, end in intervals:
+                    dx.append(x)
+                    dy.append(y)
+                    d_lo.append(start)
+                    d_hi.append(end)
+        self.dx = np.array(dx, dtype=np.intp)
+        self.dy = np.array(dy, dtype=np.intp)
+        self.d_lo = np.array(d_lo, dtype=np.float64)
+        self.d_hi = np.array(d_hi, dtype=np.float64)
+        self.pair_starts = np.array(pair_starts, dtype=np.intp)
+        self.constraint_starts = np.array(constraint_starts, dtype=np.intp)
+
+        self.mx = np.array([x for x, _ in sorter.maximize_distance], dtype=np.intp)
+        self.my = np.array([y for _, y in sorter.maximize_distance], dtype=np.intp)
+        # Members of every maximize group and the weight of each of their sorted positions
+        self.groups = [np.array(group, dtype=np.intp) for group in sorter.maximize_groups]
+        self.group_weights = [_group_weights(len(group)) for group in sorter.maximize_groups]
+
+def _group_weights(k: int) -> np.ndarray:
+    """
+    Weights of the sorted positions p_0 <= ... <= p_{k-1} of a group in the sum of the
+    distances between all its pairs: sum(|p_i - p_j|) = sum(p_i * (2i - k + 1)).
+    """
+    return 2 * np.arange(k, dtype=np.int64) - k + 1
+
+def group_distance_bound(k: int, n: int) -> int:
+    """
+    Largest sum of the distances between all pairs of a group of k elements among n
+    positions, reached with half of the group at each end of the arrangement.
+    """
+    half = k // 2
+    # Each of the k // 2 elements at the start is paired with each of the k // 2 at the end;
+    # the middle element of an odd group adds the same to either side
+    sorted_positions = list(range(half)) + [half] * (k % 2) + list(range(n - half, n))
+    return sum(p * (2 * i - k + 1) for i, p in enumerate(sorted_positions))
 
 class ConstraintSorter:
-    def __init__(self, elements: List[str]):
+    """
+    Elements are referred to by their label in the public methods and by their
+    index in `elements` (their id) everywhere else: constraints are stored as
+    tuples of ids, with identical interval lists shared between constraints,
+    and positions are lists indexed by id.
+    Counters and timings of the solver accumulate in `stats`.
+    """
+    def __init__(self, elements: List[str], stats: Optional[SolverStats] = None):
         self.elements = elements
         self.n = len(elements)
-        self.forbidden_constraints: List[Tuple[str, str, List[Tuple[float, float]]]] = []
-        self.required_disjunctive_constraints: List[Tuple[str, List[str], List[Tuple[float, float]]]] = []
-        self.maximize_distance: List[Tuple[str, str]] = []
+        self._ids: Dict[str, int] = {elem: i for i, elem in enumerate(elements)}
+        self.forbidden_constraints: List[Tuple[int, int, Tuple[Tuple[float, float], ...]]] = []
+        self.required_disjunctive_constraints: List[Tuple[int, Tuple[int, ...], Tuple[Tuple[float, float], ...]]] = []
+        self.maximize_distance: List[Tuple[int, int]] = []
+        # Groups whose members are all spread apart, scored as the sum of the distances
+        # between every pair of members without storing the pairs
+        self.maximize_groups: List[Tuple[int, ...]] = []
         self.last_violations: Optional[List[str]] = None
+        self.stats = stats if stats is not None else SolverStats()
+        self._interval_sets: Dict[Tuple[Tuple[float, float], ...], Tuple[Tuple[float, float], ...]] = {}
+        # Constraints indexed by every element they involve, so that placing or
+        # swapping an element only re-checks the constraints touching it.
+        self._forbidden_by_element: List[List[Tuple[int, int, Tuple[Tuple[float, float], ...]]]] = [[] for _ in range(self.n)]
+        self._disjunctive_by_element: List[List[Tuple[int, Tuple[int, ...], Tuple[Tuple[float, float], ...]]]] = [[] for _ in range(self.n)]
+        # Maximize-distance partners of every element (one entry per pair) and the maximize
+        # groups it belongs to, for delta scoring of swaps.
+        self._distance_partners: List[List[int]] = [[] for _ in range(self.n)]
+        self._groups_by_element: List[List[int]] = [[] for _ in range(self.n)]
+        # Built on first vectorized evaluation, dropped whenever a constraint is added
+        self._packed_constraints: Optional[_PackedConstraints] = None
+        # Cancellation token of the running solve, polled by the searches and optimizers
+        self.cancel = None
+
+    def __getstate__(self):
+        # Events do not pickle; restart workers get their own token from _init_restart_worker
+        state = self.__dict__.copy()
+        state["cancel"] = None
+        return state
+
+    def _intern_intervals(self, intervals: List[Tuple[int, int]]) -> Tuple[Tuple[float, float], ...]:
+        key = tuple((float(s), float(e)) for s, e in intervals)
+        return self._interval_sets.setdefault(key, key)
+
+    def _to_ids(self, arrangement: List[str]) -> List[int]:
+        return [self._ids[elem] for elem in arrangement]
+
+    def _to_labels(self, arrangement: List[int]) -> List[str]:
+        return [self.elements[i] for i in arrangement]
+
+    def _positions(self, arrangement: List[Optional[int]]) -> List[int]:
+        pos = [UNPLACED] * self.n
+        for i, elem in enumerate(arrangement):
+            if elem is not None and elem != UNPLACED:
+                pos[elem] = i
+        return pos
 
     def add_forbidden_constraint(self, x: str, y: str, intervals: List[Tuple[int, int]]):
         """
@@ -45,215 +184,786 @@ class ConstraintSorter:
         Intervals are relative positions: [-10,-6] means x cannot be 10 to 6 positions before y.
         Use float('inf') for 'end of list' in intervals.
         """
-        self.forbidden_constraints.append((x, y, [(float(s), float(e)) for s, e in intervals]))
+        x, y = self._ids[x], self._ids[y]
+        constraint = (x, y, self._intern_intervals(intervals))
+        self.forbidden_constraints.append(constraint)
+        self._packed_constraints = None
+        for elem in {x, y}:
+            self._forbidden_by_element[elem].append(constraint)
 
     def add_forbidden_constraint_any_y(self, x: str, y_list: List[str], intervals: List[Tuple[int, int]]):
         """
         Adds a constraint that x's relative position to AT LEAST ONE element in y_list
         must fall OUTSIDE the specified forbidden intervals.
         """
-        self.required_disjunctive_constraints.append((x, y_list, [(float(s), float(e)) for s, e in intervals]))
+        x = self._ids[x]
+        y_ids = tuple(self._ids[y] for y in y_list)
+        constraint = (x, y_ids, self._intern_intervals(intervals))
+        self.required_disjunctive_constraints.append(constraint)
+        self._packed_constraints = None
+        for elem in {x, *y_ids}:
+            self._disjunctive_by_element[elem].append(constraint)
 
     def add_maximize_distance_constraint(self, x: str, y: str):
+        self._add_maximize_distance(self._ids[x], self._ids[y])
+
+    def _add_maximize_distance(self, x: int, y: int):
         self.maximize_distance.append((x, y))
+        self._packed_constraints = None
+        if x != y:
+            self._distance_partners[x].append(y)
+            self._distance_partners[y].append(x)
 
     def add_group_maximize(self, index_set: Set[int]):
-        names = [self.elements[i] for i in index_set]
-        for u, v in itertools.combinations(names, 2):
-            self.add_maximize_distance_constraint(u, v)
+        """
+        Spread the element ids of `index_set` apart: the score gains the distance between
+        every pair of them, as with a maximize-distance constraint per pair, but the group
+        is stored once and scored from the sorted positions of its members.
+        """
+        group = tuple(sorted(set(index_set)))
+        if len(group) < 2:
+            return
+        self._packed_constraints = None
+        for elem in group:
+            self._groups_by_element[elem].append(len(self.maximize_groups))
+        self.maximize_groups.append(group)
+
+    def distance_score_bound(self) -> int:
+        """
+        Upper bound of calculate_distance_score: every maximize-distance pair at distance
+        n - 1 and every group at the best score it can reach on its own. It is exact with a
+        single group or pair, and the optimizers stop once their score reaches it.
+        """
+        pairs = sum(1 for x, y in self.maximize_distance if x != y)
+        return pairs * (self.n - 1) + sum(group_distance_bound(len(group), self.n) for group in self.maximize_groups)
+
+    @staticmethod
+    def _in_intervals(relative_pos: int, intervals: Tuple[Tuple[float, float], ...]) -> bool:
+        for start, end in intervals:
+            if start <= relative_pos <= end:
+                return True
+        return False
+
+    def _forbidden_satisfied(self, constraint: Tuple[int, int, Tuple[Tuple[float, float], ...]], pos: List[int]) -> bool:
+        x, y, intervals = constraint
+        if pos[x] == UNPLACED or pos[y] == UNPLACED:
+            return True
+        return not self._in_intervals(pos[x] - pos[y], intervals)
+
+    def _disjunctive_satisfied(self, constraint: Tuple[int, Tuple[int, ...], Tuple[Tuple[float, float], ...]], pos: List[int]) -> bool:
+        x, y_list, intervals = constraint
+        if pos[x] == UNPLACED:
+            return True
+
+        # This constraint is only active if at least one 'y' is also placed.
+        is_active = False
+        for y in y_list:
+            if pos[y] != UNPLACED:
+                is_active = True
+                if not self._in_intervals(pos[x] - pos[y], intervals):
+                    return True
+        return not is_active
 
     def is_valid_placement(self, arrangement: List[Optional[str]]) -> bool:
         """Check if a partial or full arrangement satisfies all hard constraints."""
-        pos: Dict[str, int] = {elem: i for i, elem in enumerate(arrangement) if elem is not None}
+        pos = self._positions([self._ids[elem] if elem is not None else None for elem in arrangement])
+        if UNPLACED not in pos:
+            return bool(self._evaluate_positions(np.array([pos]))[0][0])
 
         # 1. Check standard forbidden constraints
-        for x, y, intervals in self.forbidden_constraints:
-            if x not in pos or y not in pos:
-                continue
-            relative_pos = pos[x] - pos[y]
-            for start, end in intervals:
-                if start <= relative_pos <= end:
-                    return False
+        for constraint in self.forbidden_constraints:
+            if not self._forbidden_satisfied(constraint, pos):
+                return False
 
         # 2. Check required disjunctive constraints
-        for x, y_list, intervals in self.required_disjunctive_constraints:
-            if x not in pos:
-                continue
-
-            # This constraint is only active if at least one 'y' is also placed.
-            placed_ys = [y_elem for y_elem in y_list if y_elem in pos]
-            if not placed_ys:
-                continue
-
-            is_satisfied_for_x = False
-            for y in placed_ys:
-                relative_pos = pos[x] - pos[y]
-                is_in_forbidden_zone = any(start <= relative_pos <= end for start, end in intervals)
-                
-                if not is_in_forbidden_zone:
-                    is_satisfied_for_x = True
-                    break
-            
-            if not is_satisfied_for_x:
+        for constraint in self.required_disjunctive_constraints:
+            if not self._disjunctive_satisfied(constraint, pos):
                 return False
 
         return True
 
+    def is_valid_move(self, pos: List[int], moved: Iterable[int]) -> bool:
+        """
+        Incremental counterpart of is_valid_placement: only re-checks the constraints
+        involving the element ids in `moved`. `pos` holds the position of every element id
+        (UNPLACED if not placed) and must have been valid before those elements were placed or moved.
+        """
+        checks = 0
+        for elem in moved:
+            for constraint in self._forbidden_by_element[elem]:
+                checks += 1
+                if not self._forbidden_satisfied(constraint, pos):
+                    self.stats.constraint_checks += checks
+                    return False
+            for constraint in self._disjunctive_by_element[elem]:
+                checks += 1
+                if not self._disjunctive_satisfied(constraint, pos):
+                    self.stats.constraint_checks += checks
+                    return False
+        self.stats.constraint_checks += checks
+        return True
+
     def calculate_distance_score(self, arrangement: List[str]) -> float:
         """Calculate score based on distance maximization constraints (higher is better)."""
-        pos = {elem: i for i, elem in enumerate(arrangement)}
+        pos = self._positions(self._to_ids(arrangement))
+        if UNPLACED not in pos:
+            return int(self._evaluate_positions(np.array([pos]))[1][0])
+        return self._score(pos)
+
+    def evaluate_arrangements(self, arrangements: List[List[str]]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Validity and distance score of a batch of full arrangements, evaluated with
+        all constraints at once. Returns a boolean array and an integer array.
+        """
+        positions = np.empty((len(arrangements), self.n), dtype=np.int32)
+        for row, arrangement in enumerate(arrangements):
+            positions[row, self._to_ids(arrangement)] = np.arange(self.n, dtype=np.int32)
+        return self._evaluate_positions(positions)
+
+    def _evaluate_positions(self, positions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Vectorized validity and score of full arrangements given as a (batch, n) array of positions by element id."""
+        if self._packed_constraints is None:
+            self._packed_constraints = _PackedConstraints(self)
+        packed = self._packed_constraints
+        valid = np.ones(len(positions), dtype=bool)
+        self.stats.constraint_checks += len(positions) * (len(self.forbidden_constraints) + len(self.required_disjunctive_constraints))
+
+        if len(packed.fx):
+            relative = positions[:, packed.fx] - positions[:, packed.fy]
+            valid &= ~((packed.f_lo <= relative) & (relative <= packed.f_hi)).any(axis=1)
+
+        if len(packed.dx):
+            relative = positions[:, packed.dx] - positions[:, packed.dy]
+            inside = (packed.d_lo <= relative) & (relative <= packed.d_hi)
+            blocked = np.logical_or.reduceat(inside, packed.pair_starts, axis=1)
+            valid &= ~np.logical_and.reduceat(blocked, packed.constraint_starts, axis=1).any(axis=1)
+
+        if len(packed.mx):
+            scores = np.abs(positions[:, packed.mx] - positions[:, packed.my]).sum(axis=1, dtype=np.int64)
+        else:
+            scores = np.zeros(len(positions), dtype=np.int64)
+        for members, weights in zip(packed.groups, packed.group_weights):
+            scores += np.sort(positions[:, members], axis=1) @ weights
+        return valid, scores
+
+    def _score(self, pos: List[int]) -> float:
         total_distance = 0
         for x, y in self.maximize_distance:
-            if x in pos and y in pos:
+            if pos[x] != UNPLACED and pos[y] != UNPLACED:
                 total_distance += abs(pos[x] - pos[y])
+        if self.maximize_groups:
+            # In position order, each placed member is at distance p - q of every member
+            # placed before it at q: count * p - sum(q) over the members seen so far
+            order = [UNPLACED] * self.n
+            for elem, p in enumerate(pos):
+                if p != UNPLACED:
+                    order[p] = elem
+            count = [0] * len(self.maximize_groups)
+            position_sum = [0] * len(self.maximize_groups)
+            for p, elem in enumerate(order):
+                if elem == UNPLACED:
+                    continue
+                for g in self._groups_by_element[elem]:
+                    total_distance += count[g] * p - position_sum[g]
+                    count[g] += 1
+                    position_sum[g] += p
         return total_distance
 
-    def local_search_optimization(self, initial_arrangement: List[str], max_iterations: int = 2000) -> List[str]:
-        """Improve arrangement using local search while maintaining constraint satisfaction."""
-        current = initial_arrangement.copy()
-        current_score = self.calculate_distance_score(current)
-
-        for _ in range(max_iterations):
-            i, j = random.sample(range(self.n), 2)
-            new_arrangement = current.copy()
-            new_arrangement[i], new_arrangement[j] = new_arrangement[j], new_arrangement[i]
-
-            if self.is_valid_placement(new_arrangement):
-                new_score = self.calculate_distance_score(new_arrangement)
-                if new_score > current_score:
-                    current = new_arrangement
-                    current_score = new_score
+    def swap_delta(self, pos: List[int], a: int, b: int) -> int:
+        """
+        Change of calculate_distance_score if element ids a and b swapped positions,
+        computed from the maximize-distance pairs and groups touching a or b only. Groups
+        holding both elements keep the same set of positions and do not change.
+        """
+        i, j = pos[a], pos[b]
+        delta = 0
+        for partner in self._distance_partners[a]:
+            if partner != b:
+                k = pos[partner]
+                delta += abs(j - k) - abs(i - k)
+        for partner in self._distance_partners[b]:
+            if partner != a:
+                k = pos[partner]
+                delta += abs(i - k) - abs(j - k)
+        groups_a = self._groups_by_element[a]
+        groups_b = self._groups_by_element[b]
+        for g in groups_a:
+            if g not in groups_b:
+                for member in self.maximize_groups[g]:
+                    if member != a:
+                        k = pos[member]
+                        delta += abs(j - k) - abs(i - k)
+        for g in groups_b:
+            if g not in groups_a:
+                for member in self.maximize_groups[g]:
+                    if member != b:
+                        k = pos[member]
+                        delta += abs(i - k) - abs(j - k)
+        return delta
+
+    def local_search_optimization(self, initial_arrangement: List[str], max_iterations: int = 2000, batch_size: int = 1) -> List[str]:
+        """
+        Improve arrangement using local search while maintaining constraint satisfaction.
+        With `batch_size` > 1, each step scores that many random swaps in one vectorized
+        evaluation and applies the best valid one; `max_iterations` counts swaps either way.
+        Stops early once the score reaches distance_score_bound().
+        """
+        if batch_size > 1:
+            return self._to_labels(self._hill_climb_batch(self._to_ids(initial_arrangement), max_iterations, batch_size))
+        return self._to_labels(self._hill_climb(self._to_ids(initial_arrangement), max_iterations))
+
+    def _hill_climb_batch(self, current: List[int], max_iterations: int, batch_size: int) -> List[int]:
+        if self.n < 2:
+            return current
+        rng = np.random.default_rng(random.randrange(2**32))
+        arrangement = np.array(current, dtype=np.intp)
+        pos = np.array(self._positions(current), dtype=np.int32)
+        current_score = self._evaluate_positions(pos[np.newaxis, :])[1][0]
+        bound = self.distance_score_bound()
+        rows = np.arange(batch_size)
+        start = time.perf_counter()
+        self.stats.score_history = [(0.0, int(current_score))]
+
+        for _ in range(-(-max_iterations // batch_size)):
+            if current_score >= bound:
+                break
+            _check_cancelled(self.cancel)
+            self.stats.moves_tried += batch_size
+            i = rng.integers(0, self.n, batch_size)
+            j = (i + rng.integers(1, self.n, batch_size)) % self.n
+            a, b = arrangement[i], arrangement[j]
+            candidates = np.repeat(pos[np.newaxis, :], batch_size, axis=0)
+            candidates[rows, a] = j
+            candidates[rows, b] = i
+            valid, scores = self._evaluate_positions(candidates)
+            scores = np.where(valid, scores, -1)
+            best = int(scores.argmax())
+            if scores[best] > current_score:
+                current_score = scores[best]
+                pos = candidates[best]
+                arrangement[i[best]], arrangement[j[best]] = b[best], a[best]
+                self.stats.moves_accepted += 1
+                self.stats.score_history.append((time.perf_counter() - start, int(current_score)))
+        return arrangement.tolist()
+
+    def _hill_climb(self, current: List[int], max_iterations: int) -> List[int]:
+        if self.n < 2:
+            return current
+        pos = self._positions(current)
+        score = self._score(pos)
+        bound = self.distance_score_bound()
+        start = time.perf_counter()
+        self.stats.score_history = [(0.0, score)]
+
+        for iteration in range(max_iterations):
+            if score >= bound:
+                break
+            if iteration % 1024 == 0:
+                _check_cancelled(self.cancel)
+            self.stats.moves_tried += 1
+            i = random.randrange(self.n)
+            j = random.randrange(self.n - 1)
+            if j >= i:
+                j += 1
+            a, b = current[i], current[j]
+            # Scoring is cheaper than validating, so only improving swaps get checked
+            delta = self.swap_delta(pos, a, b)
+            if delta <= 0:
+                continue
+            pos[a], pos[b] = j, i
+            if self.is_valid_move(pos, (a, b)):
+                current[i], current[j] = b, a
+                score += delta
+                self.stats.moves_accepted += 1
+                self.stats.score_history.append((time.perf_counter() - start, score))
+            else:
+                pos[a], pos[b] = i, j
         return current
 
-    # Replace your old solve() method with this new one
-    def solve(self, max_iterations: int = 2000) -> Optional[List[str]]:
+    def simulated_annealing(self, initial_arrangement: List[str], time_limit: float = 1.0, patience: Optional[int] = None) -> List[str]:
+        """
+        Improve arrangement with simulated annealing on valid swaps, cooling geometrically over
+        `time_limit` seconds. Stops early once `patience` iterations (100 per element by default)
+        pass without improving the best score, or once it reaches distance_score_bound().
+        Returns the best arrangement seen and records its score over time in stats.score_history.
+        """
+        return self._to_labels(self._anneal(self._to_ids(initial_arrangement), time_limit, patience))
+
+    def _anneal(self, current: List[int], time_limit: float, patience: Optional[int] = None) -> List[int]:
+        best = current.copy()
+        pos = self._positions(current)
+        score = best_score = self._score(pos)
+        self.stats.score_history = [(0.0, best_score)]
+        if self.n < 2:
+            return best
+        if patience is None:
+            patience = 100 * self.n
+        bound = self.distance_score_bound()
+
+        # Start hot enough to accept a typical worsening swap about a third of the time
+        sample = [abs(self.swap_delta(pos, *random.sample(current, 2))) for _ in range(min(100, self.n * 4))]
+        initial_temperature = max(sum(sample) / len(sample), 1.0)
+        final_temperature = initial_temperature * 1e-3
+
+        start = time.perf_counter()
+        temperature = initial_temperature
+        iteration = 0
+        since_improvement = 0
+        accepted = 0
+        while since_improvement < patience and best_score < bound:
+            if iteration % 256 == 0:
+                _check_cancelled(self.cancel)
+                elapsed = time.perf_counter() - start
+                if elapsed >= time_limit:
+                    break
+                temperature = initial_temperature * (final_temperature / initial_temperature) ** (elapsed / time_limit)
+            iteration += 1
+            since_improvement += 1
+
+            i = random.randrange(self.n)
+            j = random.randrange(self.n - 1)
+            if j >= i:
+                j += 1
+            a, b = current[i], current[j]
+            delta = self.swap_delta(pos, a, b)
+            if delta < 0 and random.random() >= math.exp(delta / temperature):
+                continue
+            pos[a], pos[b] = j, i
+            if not self.is_valid_move(pos, (a, b)):
+                pos[a], pos[b] = i, j
+                continue
+            current[i], current[j] = b, a
+            accepted += 1
+            score += delta
+            if score > best_score:
+                best_score = score
+                best = current.copy()
+                since_improvement = 0
+                self.stats.score_history.append((time.perf_counter() - start, best_score))
+        self.stats.moves_tried += iteration
+        self.stats.moves_accepted += accepted
+        return best
+
+    def solve(self, max_iterations: int = 2000, solver: str = "backtracking", workers: int = 8, time_limit: float = 10.0,
+              optimizer: str = "hill_climbing", restarts: int = 1, node_limit: Optional[int] = None,
+              progress: Optional[Callable[[int, int], None]] = None, initial: Optional[List[str]] = None,
+              keep_valid_initial: bool = False, cancel=None) -> Optional[List[str]]:
         """
-        Finds a valid arrangement using backtracking, then optimizes it for distance.
+        Finds a valid arrangement, then optimizes it for distance.
+        `solver` selects the search used for the first valid arrangement:
+        "backtracking" (plain backtracking), "propagation" (forward checking on position domains)
+        or "cpsat" (OR-Tools CP-SAT with `workers` threads, which optimizes the distance score itself).
+        The Python searches give up after `node_limit` placement attempts or `time_limit` seconds,
+        calling `progress(nodes, placed_elements)` periodically.
+        `optimizer` selects how the distance score is then improved: "hill_climbing"
+        (`max_iterations` random swaps) or "annealing" (simulated annealing for whatever
+        is left of `time_limit`).
+        With `restarts` > 1, the Python solvers run that many randomized restarts (shuffled
+        element order and seed) on a pool of `workers` processes and keep the best result.
+        A full `initial` arrangement, such as the previous solution, is repaired by local
+        swaps first (or given to CP-SAT as a hint), and the search only runs if that fails.
+        It is not used by restarts. With `keep_valid_initial`, an initial arrangement that
+        already satisfies every constraint is returned as is, without optimizing it.
+        `cancel` is a threading.Event polled at the checkpoints of the searches and optimizers;
+        once it is set, the solve stops by raising SortCancelled.
+        Nodes, backtracks, constraint checks, moves, phase times and the best-score
+        trajectory of the run accumulate in `stats`.
         Returns the best arrangement found, or None if no valid arrangement exists.
         """
+        if optimizer not in ("hill_climbing", "annealing"):
+            raise ValueError(f"Unknown optimizer {optimizer!r}")
+        if solver not in ("backtracking", "propagation", "cpsat"):
+            raise ValueError(f"Unknown solver {solver!r}")
         self.last_violations = []
-        
-        # Find a single valid arrangement using a systematic backtracking search
-        valid_arrangement = self._solve_backtracking()
+        self.stats.score_history = []
+        self.cancel = cancel
+        if initial is not None and len(initial) != self.n:
+            initial = None
+        if keep_valid_initial and initial is not None and self.is_valid_placement(initial):
+            return list(initial)
+
+        try:
+            if restarts > 1 and solver != "cpsat":
+                arrangement = self._solve_restarts(restarts, workers, max_iterations, solver, time_limit, optimizer, node_limit)
+            else:
+                limits = _SearchLimits(time_limit, node_limit, progress, cancel)
+                initial_ids = self._to_ids(initial) if initial is not None else None
+                arrangement = self._solve_once(None, limits, max_iterations, solver, workers, time_limit, optimizer, initial_ids)
+        except SearchLimitReached as e:
+            self.last_violations = [f"The {solver} solver gave up without finding a valid arrangement: {e}."]
+            return None
+
+        if arrangement is None:
+            self.last_violations = [f"No valid arrangement could be found by the {solver} solver."]
+            return None
+        return self._to_labels(arrangement)
+
+    def _solve_once(self, rng: Optional[random.Random], limits: _SearchLimits, max_iterations: int, solver: str, workers: int, time_limit: float, optimizer: str,
+                    initial: Optional[List[int]] = None) -> Optional[List[int]]:
+        """
+        One search followed by one optimization; `rng` randomizes the search order and
+        `initial` is an arrangement to repair before searching.
+        """
+        start = time.perf_counter()
+
+        # Find a single valid arrangement using a systematic search
+        with self.stats.phase("search"):
+            try:
+                if solver == "cpsat":
+                    from .cpsat_backend import solve_cpsat
+                    return solve_cpsat(self, workers, time_limit, initial)
+                valid_arrangement = self._repair(list(initial), limits) if initial is not None else None
+                if valid_arrangement is None:
+                    if solver == "backtracking":
+                        valid_arrangement = self._solve_backtracking(rng, limits)
+                    else:
+                        valid_arrangement = self._solve_propagation(rng, limits)
+            finally:
+                self.stats.nodes += limits.nodes
+                self.stats.backtracks += limits.backtracks
 
         if valid_arrangement is None:
-            self.last_violations = ["No valid arrangement could be found by the backtracking solver."]
             return None
 
         # If a valid solution is found, optimize it for the distance score
-        if self.maximize_distance:
-            optimized_arrangement = self.local_search_optimization(valid_arrangement, max_iterations)
-            return optimized_arrangement
+        if self.maximize_distance or self.maximize_groups:
+            with self.stats.phase("optimize"):
+                if optimizer == "annealing":
+                    remaining = max(time_limit - (time.perf_counter() - start), 0.0)
+                    return self._anneal(valid_arrangement, remaining)
+                optimized_arrangement = self._hill_climb(valid_arrangement, max_iterations)
+                return optimized_arrangement
         
         return valid_arrangement
 
+    def _solve_restarts(self, restarts: int, workers: int, max_iterations: int, solver: str, time_limit: float, optimizer: str, node_limit: Optional[int]) -> Optional[List[int]]:
+        """
+        Run independent randomized restarts in a process pool and keep the best valid arrangement.
+        The cancellation token is relayed to the workers, which stop at their next checkpoint.
+        All the restarts share one deadline, `time_limit` seconds from now, however many of
+        them wait for a worker. Raises SearchLimitReached if no restart found a valid
+        arrangement and at least one of them gave up before finishing its search.
+        """
+        best_score = multiprocessing.Value('d', -math.inf)
+        cancelled = multiprocessing.Event()
+        seeds = [random.randrange(2**32) for _ in range(restarts)]
+        # Wall clock time, comparable between processes
+        deadline = time.time() + time_limit
+        best = None
+        limit_reached = None
+        with ProcessPoolExecutor(max_workers=min(workers, restarts), initializer=_init_restart_worker, initargs=(self, best_score, cancelled)) as executor:
+            futures = [executor.submit(_run_restart, seed, max_iterations, solver, deadline, optimizer, node_limit) for seed in seeds]
+            pending = futures
+            while pending:
+                pending = wait(pending, timeout=0.05).not_done
+                if self.cancel is not None and self.cancel.is_set():
+                    cancelled.set()
+            for future in futures:
+                result = future.result()
+                self.stats.merge(result[2])
+                if result[1] is not None and (best is None or result[0] > best[0]):
+                    best = result
+                if result[3] is not None:
+                    limit_reached = result[3]
+        if best is None:
+            if limit_reached is not None:
+                raise SearchLimitReached(limit_reached)
+            return None
+        self.stats.score_history = best[2].score_history
+        return best[1]
+
+    def _violated(self, constraint, pos: List[int]) -> bool:
+        if isinstance(constraint[1], tuple):
+            return not self._disjunctive_satisfied(constraint, pos)
+        return not self._forbidden_satisfied(constraint, pos)
+
+    def _touching(self, elem: int) -> list:
+        return self._forbidden_by_element[elem] + self._disjunctive_by_element[elem]
+
+    def _repair(self, current: List[int], limits: _SearchLimits, max_steps: Optional[int] = None) -> Optional[List[int]]:
+        """
+        Min-conflicts repair of a full arrangement: while a constraint is violated, one of its
+        elements is swapped with the element that leaves the fewest violated constraints
+        around the two, ties broken at random. Returns the repaired arrangement (modified in
+        place), or None if constraints are still violated after `max_steps` swaps
+        (100 plus 10 per initially violated constraint by default).
+        """
+        pos = self._positions(current)
+        violated = {c for c in self.forbidden_constraints if not self._forbidden_satisfied(c, pos)}
+        violated.update(c for c in self.required_disjunctive_constraints if not self._disjunctive_satisfied(c, pos))
+        self.stats.constraint_checks += len(self.forbidden_constraints) + len(self.required_disjunctive_constraints)
+        if max_steps is None:
+            max_steps = 100 + 10 * len(violated)
+        if self.n < 2:
+            # No other element to swap with
+            return current if not violated else None
+
+        for _ in range(max_steps):
+            if not violated:
+                return current
+            x, y, _ = random.choice(list(violated))
+            a = random.choice((x,) + y if isinstance(y, tuple) else (x, y))
+            touching_a = self._touching(a)
+            best_cost = None
+            best = []
+            for b in range(self.n):
+                if b == a:
+                    continue
+                limits.count_node(self.n - len(violated))
+                touching = touching_a + self._touching(b)
+                before = sum(1 for c in touching if c in violated)
+                pos[a], pos[b] = pos[b], pos[a]
+                cost = sum(1 for c in touching if self._violated(c, pos)) - before
+                pos[a], pos[b] = pos[b], pos[a]
+                self.stats.constraint_checks += len(touching)
+                if best_cost is None or cost < best_cost:
+                    best_cost = cost
+                    best = [b]
+                elif cost == best_cost:
+                    best.append(b)
+            b = random.choice(best)
+            i, j = pos[a], pos[b]
+            pos[a], pos[b] = j, i
+            current[i], current[j] = b, a
+            for c in touching_a + self._touching(b):
+                if self._violated(c, pos):
+                    violated.add(c)
+                else:
+                    violated.discard(c)
+        return current if not violated else None
+
     # Add this new private helper method for the backtracking logic
-    def _solve_backtracking(self) -> Optional[List[str]]:
+    def _solve_backtracking(self, rng: Optional[random.Random] = None, limits: Optional[_SearchLimits] = None) -> Optional[List[int]]:
         """
         A systematic backtracking search to find one valid arrangement.
+        `rng` shuffles the order of equally constrained elements.
         """
-        arrangement: List[Optional[str]] = [None] * self.n
-        remaining_elements = set(self.elements)
+        arrangement: List[int] = [UNPLACED] * self.n
 
         # A simple heuristic: try to place more constrained elements first.
-        constrained_elements_count = {elem: 0 for elem in self.elements}
-        all_constraints = (self.forbidden_constraints + self.required_disjunctive_constraints)
-        for constraint in all_constraints:
-            constrained_elements_count[constraint[0]] += 1
-            for y in constraint[1]:
-                 constrained_elements_count[y] += 1
+        constrained_elements_count = [0] * self.n
+        for x, y, _ in self.forbidden_constraints:
+            constrained_elements_count[x] += 1
+            constrained_elements_count[y] += 1
+        for x, y_list, _ in self.required_disjunctive_constraints:
+            constrained_elements_count[x] += 1
+            for y in y_list:
+                constrained_elements_count[y] += 1
         
         # Sort elements to place by how constrained they are, descending.
-        elements_to_place = sorted(
-            list(self.elements), 
-            key=lambda e: constrained_elements_count[e], 
-            reverse=True
-        )
-
-        return self._backtrack_recursive(arrangement, elements_to_place)
-
-    def _backtrack_recursive(self, arrangement: List[Optional[str]], elements_to_place: List[str]) -> Optional[List[str]]:
-        """The recursive core of the backtracking solver."""
-        # Base case: If there are no more elements to place, we found a solution.
-        if not elements_to_place:
-            return [elem for elem in arrangement if elem is not None]
-
-        element_to_try = elements_to_place[0]
-        remaining = elements_to_place[1:]
-
-        # Iterate through all available empty slots for the current element
-        for i in range(self.n):
-            if arrangement[i] is None:
-                # Try placing the element in the current slot
-                arrangement[i] = element_to_try
-
-                # Check if this partial arrangement is still valid
-                if self.is_valid_placement(arrangement):
-                    # If it's valid, recurse to place the next element
-                    result = self._backtrack_recursive(arrangement, remaining)
-                    if result:
-                        return result  # Solution found, propagate it up
-
-                # Backtrack: Undo the placement if it didn't lead to a solution
-                arrangement[i] = None
-        
-        # If we tried all positions for this element and none worked, this path is a dead end.
-        return None
+        elements_to_place = list(range(self.n))
+        if rng is not None:
+            rng.shuffle(elements_to_place)
+        elements_to_place.sort(key=lambda e: constrained_elements_count[e], reverse=True)
+
+        return self._backtrack(arrangement, elements_to_place, limits or _SearchLimits())
+
+    def _backtrack(self, arrangement: List[int], elements_to_place: List[int], limits: _SearchLimits) -> Optional[List[int]]:
+        """
+        The core of the backtracking solver, iterative so that its depth is not bound by the
+        recursion limit. elements_to_place[depth] is placed at depth `depth`, and cursors[depth]
+        is the next slot to try for it.
+        """
+        pos = [UNPLACED] * self.n
+        cursors = [0] * (self.n + 1)
+        depth = 0
+        while True:
+            # Base case: If every element is placed, we found a solution.
+            if depth == self.n:
+                return list(arrangement)
 
-def get_intervals(interval_str):
-    # First, parse the positions of intervals
-    intervals = [[], []]
-    neg_pos = interval_str.split('|')
-    positive = 0
-    for neg_pos_part in [neg_pos[0], neg_pos[2]]:
-        parts = re.split(r'_', neg_pos_part)
-        for part in parts:
-            if not part:
-                intervals[positive].append((None, None))
-            elif ":" in part:
-                start, end = part.split(':')
-                try:
-                    start = int(start)
-                except:
-                    start = float('inf')
-                try:
-                    end = int(end)
-                except:
-                    end = float('inf')
-                if not positive:
-                    start = -start
-                    end = -end
-                intervals[positive].append((start, end))
+            element_to_try = elements_to_place[depth]
+            # Backtrack: Undo the previous placement of this element before trying the next slot
+            if pos[element_to_try] != UNPLACED:
+                arrangement[pos[element_to_try]] = UNPLACED
+                pos[element_to_try] = UNPLACED
+
+            # Iterate through the remaining empty slots for the current element
+            i = cursors[depth]
+            while i < self.n:
+                if arrangement[i] == UNPLACED:
+                    limits.count_node(depth)
+                    arrangement[i] = element_to_try
+                    pos[element_to_try] = i
+                    # Only the constraints touching the new element can have become violated
+                    if self.is_valid_move(pos, (element_to_try,)):
+                        break
+                    arrangement[i] = UNPLACED
+                    pos[element_to_try] = UNPLACED
+                i += 1
+
+            if i < self.n:
+                cursors[depth] = i + 1
+                depth += 1
+                cursors[depth] = 0
+            elif depth == 0:
+                # Every slot failed for the first element: there is no solution.
+                return None
             else:
-                intervals[positive].append((int(part), int(part)))
-        positive = 1
+                limits.backtracks += 1
+                depth -= 1
 
-    # Now calculate underscore intervals
-    result = []
-    positive = 0
-    for neg_pos_part in intervals:
-        for i in range(len(neg_pos_part) - 1):
-            end_of_current = neg_pos_part[i][1]
-            start_of_next = neg_pos_part[i+1][0]
-            if end_of_current is None:
-                if not positive:
-                    end_of_current = -float('inf')
-                elif result and result[-1][1] == -1:
-                    end_of_current = result[-1][0] - 1
-                    del result[-1]
-                else:
-                    end_of_current = 0
-            if start_of_next is None:
-                if not positive:
-                    start_of_next = 0
-                else:
-                    start_of_next = float('inf')
-            if start_of_next - end_of_current <= 1:
-                raise ValueError("Invalid interval: overlapping or adjacent intervals found.")
-            result.append((end_of_current + 1, start_of_next - 1))
-        positive = 1
-    
-    return result
+    def _interval_mask(self, lo: float, hi: float) -> int:
+        """Bitset of the positions in [lo, hi], clipped to the arrangement."""
+        lo = max(lo, 0)
+        hi = min(hi, self.n - 1)
+        if lo > hi:
+            return 0
+        lo, hi = int(lo), int(hi)
+        return ((1 << (hi - lo + 1)) - 1) << lo
+
+    def _allowed_relative_to(self, anchor: int, intervals: Tuple[Tuple[float, float], ...], sign: int) -> int:
+        """
+        Bitset of the positions q such that sign * (q - anchor) is outside every interval,
+        i.e. the positions left to an element once its partner sits at `anchor`.
+        """
+        forbidden = 0
+        for start, end in intervals:
+            if sign > 0:
+                forbidden |= self._interval_mask(anchor + start, anchor + end)
+            else:
+                forbidden |= self._interval_mask(anchor - end, anchor - start)
+        return ~forbidden
+
+    def _solve_propagation(self, rng: Optional[random.Random] = None, limits: Optional[_SearchLimits] = None) -> Optional[List[int]]:
+        """
+        Backtracking with forward checking. Every unplaced element keeps a bitset of the
+        positions still allowed for it, pruned after each placement with the intervals of
+        the constraints touching the placed element. The element with the smallest domain
+        is placed next and a branch is abandoned as soon as a domain becomes empty.
+        `rng` randomizes the order among equally constrained elements.
+        """
+        # Ties on domain size are broken by placing the most constrained elements first.
+        priority = [
+            (-len(self._forbidden_by_element[elem]) - len(self._disjunctive_by_element[elem]),
+             rng.random() if rng is not None else 0)
+            for elem in range(self.n)
+        ]
+        full = (1 << self.n) - 1
+        domains = {elem: full for elem in range(self.n)}
+        pos = [UNPLACED] * self.n
+        if not self._propagate(domains, pos, priority, limits or _SearchLimits()):
+            return None
+        arrangement = [UNPLACED] * self.n
+        for elem, i in enumerate(pos):
+            arrangement[i] = elem
+        return arrangement
+
+    def _propagate(self, domains: Dict[int, int], pos: List[int], priority: List[Tuple[int, float]], limits: _SearchLimits) -> bool:
+        """
+        The core of the propagation solver, iterative like _backtrack. Each stack frame holds
+        the element placed at that depth, the positions of its domain not tried yet, and the
+        domains of the other unplaced elements before it was placed.
+        """
+        stack: List[list] = []
+        while domains:
+            elem = min(domains, key=lambda e: (domains[e].bit_count(), priority[e]))
+            stack.append([elem, domains.pop(elem), domains])
+
+            # Find the next position that survives forward checking, backtracking as needed
+            while stack:
+                frame = stack[-1]
+                elem, remaining, level_domains = frame
+                pos[elem] = UNPLACED
+                pruned = None
+                while remaining and pruned is None:
+                    low_bit = remaining & -remaining
+                    remaining ^= low_bit
+                    i = low_bit.bit_length() - 1
+                    limits.count_node(len(stack) - 1)
+                    pos[elem] = i
+                    pruned = self._forward_check(elem, i, level_domains, pos)
+                frame[1] = remaining
+                if pruned is not None:
+                    domains = pruned
+                    break
+                pos[elem] = UNPLACED
+                stack.pop()
+                limits.backtracks += 1
+            else:
+                return False
+        return True
+
+    def _forward_check(self, elem: int, i: int, domains: Dict[int, int], pos: List[int]) -> Optional[Dict[int, int]]:
+        """
+        Domains of the unplaced elements after placing `elem` at `i`,
+        or None if some constraint can no longer be satisfied.
+        """
+        self.stats.constraint_checks += len(self._forbidden_by_element[elem]) + len(self._disjunctive_by_element[elem])
+        occupied = ~(1 << i)
+        pruned = {other: domain & occupied for other, domain in domains.items()}
+
+        for constraint in self._forbidden_by_element[elem]:
+            x, y, intervals = constraint
+            if x == y:
+                if not self._forbidden_satisfied(constraint, pos):
+                    return None
+            elif x == elem and y in pruned:
+                # pos[x] - pos[y] must avoid the intervals
+                pruned[y] &= self._allowed_relative_to(i, intervals, -1)
+            elif y == elem and x in pruned:
+                pruned[x] &= self._allowed_relative_to(i, intervals, 1)
+
+        for constraint in self._disjunctive_by_element[elem]:
+            x, y_list, intervals = constraint
+            if not y_list:
+                continue
+            if pos[x] != UNPLACED:
+                if any(pos[y] != UNPLACED and not self._in_intervals(pos[x] - pos[y], intervals) for y in y_list):
+                    continue
+                unplaced = {y for y in y_list if pos[y] == UNPLACED}
+                if not unplaced:
+                    return None
+                if len(unplaced) == 1:
+                    y = unplaced.pop()
+                    pruned[y] &= self._allowed_relative_to(pos[x], intervals, -1)
+            elif all(pos[y] != UNPLACED for y in y_list):
+                allowed = 0
+                for y in y_list:
+                    allowed |= self._allowed_relative_to(pos[y], intervals, 1)
+                pruned[x] &= allowed
+
+        for domain in pruned.values():
+            if not domain:
+                return None
+        return pruned
+
+# Per-process state of the restart pool, set once per worker by _init_restart_worker
+_restart_sorter: Optional[ConstraintSorter] = None
+_restart_best_score = None
+
+def _init_restart_worker(sorter: ConstraintSorter, best_score, cancelled):
+    global _restart_sorter, _restart_best_score
+    _restart_sorter = sorter
+    _restart_sorter.cancel = cancelled
+    _restart_best_score = best_score
+
+def _run_restart(seed: int, max_iterations: int, solver: str, deadline: float, optimizer: str, node_limit: Optional[int]):
+    """
+    One randomized restart, stopping at the time.time() `deadline` shared by all of them.
+    Returns (score, arrangement, stats, limit_reached), with the arrangement left out when
+    another restart already published a score at least as good, the score and arrangement
+    both None if no valid arrangement was found, and `limit_reached` the reason the search
+    gave up if it ran out of nodes or time before finishing (None otherwise).
+    """
+    random.seed(seed)
+    stats = _restart_sorter.stats = SolverStats()
+    time_limit = deadline - time.time()
+    if time_limit <= 0:
+        return None, None, stats, "time limit reached"
+    limits = _SearchLimits(time_limit, node_limit, cancel=_restart_sorter.cancel)
+    try:
+        arrangement = _restart_sorter._solve_once(random.Random(seed), limits, max_iterations, solver, 1, time_limit, optimizer)
+    except SearchLimitReached as e:
+        return None, None, stats, str(e)
+    if arrangement is None:
+        return None, None, stats, None
+    score = _restart_sorter._score(_restart_sorter._positions(arrangement))
+    with _restart_best_score.get_lock():
+        if score <= _restart_best_score.value:
+            return score, None, stats, None
+        _restart_best_score.value = score
+    return score, arrangement, stats, None
 
 def generate_unique_strings(n):
     charset = string.ascii_lowercase  # you can expand this (e.g. add digits or uppercase)
@@ -267,6 +977,87 @@ def generate_unique_strings(n):
                 return result
         length += 1
 
+def find_cycles(graph: List[Iterable[int]]) -> List[List[int]]:
+    """
+    Strongly connected components of `graph` (node i has edges to graph[i]) that contain a
+    cycle, each as a sorted list of nodes, in one pass of Tarjan's algorithm. Iterative, so
+    that long chains do not hit the recursion limit.
+    """
+    index = [-1] * len(graph)
+    lowlink = [0] * len(graph)
+    on_stack = [False] * len(graph)
+    stack = []
+    cycles = []
+    counter = 0
+    for root in range(len(graph)):
+        if index[root] != -1:
+            continue
+        index[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        # Each frame is a node and the iterator over its remaining edges
+        frames = [(root, iter(graph[root]))]
+        while frames:
+            node, edges = frames[-1]
+            for target in edges:
+                if index[target] == -1:
+                    index[target] = lowlink[target] = counter
+                    counter += 1
+                    stack.append(target)
+                    on_stack[target] = True
+                    frames.append((target, iter(graph[target])))
+                    break
+                if on_stack[target]:
+                    lowlink[node] = min(lowlink[node], index[target])
+            else:
+                frames.pop()
+                if frames:
+                    parent = frames[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        component.append(member)
+                        if member == node:
+                            break
+                    if len(component) > 1 or node in graph[node]:
+                        cycles.append(sorted(component))
+    return cycles
+
+@lru_cache(maxsize=32)
+def pointer_closure(point_to: Tuple[Tuple[int, ...], ...]) -> Tuple[Tuple[int, ...], Tuple[FrozenSet[int], ...]]:
+    """
+    Topological order of the rows of an acyclic pointer graph, every row after the rows it
+    points to, and the set of rows each row points to directly or transitively.
+    `point_to[i]` lists the rows row i points to. The result is cached, so re-sorting a
+    table whose pointer columns did not change skips the walk.
+    """
+    pointed_by = [[] for _ in range(len(point_to))]
+    remaining = [0] * len(point_to)
+    for i, targets in enumerate(point_to):
+        targets = set(targets)
+        remaining[i] = len(targets)
+        for k in targets:
+            pointed_by[k].append(i)
+    order = [i for i in range(len(point_to)) if not remaining[i]]
+    # Rows become ready once all their targets are placed; the loop sees the appended rows
+    for k in order:
+        for i in pointed_by[k]:
+            remaining[i] -= 1
+            if not remaining[i]:
+                order.append(i)
+    reach: List[FrozenSet[int]] = [frozenset()] * len(point_to)
+    for i in order:
+        targets = set()
+        for k in point_to[i]:
+            targets.add(k)
+            targets |= reach[k]
+        reach[i] = frozenset(targets)
+    return tuple(order), tuple(reach)
+
 def go(strings, instructions, sorter):
     for idx, inst_list in enumerate(instructions):
         current = strings[idx]
@@ -287,52 +1078,221 @@ def go(strings, instructions, sorter):
                 for target in targets:
                     sorter.add_maximize_distance_constraint(current, target)
 
+def _renumber_instruction(pattern: Tuple[str, ...], instr: str, new_pos: List[int]) -> str:
+    """
+    `instr`, an instruction of a dependencies column with pattern `pattern`, with the row
+    number it targets replaced by the new position of that row. The number is located in
+    the cell from its span in the parsed instruction. Instructions without a number, that do
+    not parse or whose number is part of the pattern are returned unchanged.
+    """
+    try:
+        parsed = parse_instruction(pattern, instr)
+    except ValueError:
+        return instr
+    if parsed.number_span is None or parsed.number >= len(new_pos):
+        return instr
+    start, end = parsed.number_span
+    parts = instr.split('.')
+    # Offset of each part of the cell in the instruction expanded with the pattern
+    offset = len(pattern[0])
+    for k, part in enumerate(parts):
+        if offset <= start and end <= offset + len(part):
+            parts[k] = part[:start - offset] + str(new_pos[parsed.number]) + part[end - offset:]
+            return '.'.join(parts)
+        offset += len(part) + len(pattern[k + 1])
+    return instr
+
+def _renumber_pointer(instr: str, new_pos: List[int]) -> str:
+    """A pointer to a row number changed to the new position of that row; names are returned unchanged."""
+    try:
+        k = int(instr)
+    except ValueError:
+        return instr
+    return str(new_pos[k]) if 0 < k < len(new_pos) else instr
+
 def order_table(res, table, roles, dep_pattern):
+    """
+    Rows of `table` in the order `res` (old row indexes, header first), with the row numbers
+    in the dependencies and pointers cells changed to the new positions of the rows they
+    refer to. Each cell is read once; the rows of `table` are not modified.
+    """
     new_pos = [0] * len(table)
     for i, old_index in enumerate(res):
         new_pos[old_index] = i
-    updated_roles = [False] * len(roles)
+    patterns = [tuple(pattern) for pattern in dep_pattern]
     new_table = [table[0]]
     for n in res[1:]:
-        row = table[n]
+        row = list(table[n])
         for j, cell in enumerate(row):
+            if not cell:
+                continue
             if roles[j] == 'dependencies':
-                if cell:
-                    updated_cell = cell.split(';')
-                    for d, instr in enumerate(list(updated_cell)):
-                        instr_split = instr.split('.')
-                        if dep_pattern[j]:
-                            instr = dep_pattern[j][0] + ''.join([instr_split[i]+dep_pattern[j][i+1] for i in range(len(instr_split))])
-                        match = re.match(PATTERN_DISTANCE, instr)
-                        if not match:
-                            match = re.match(PATTERN_AREAS, instr)
-                        if match.group("number"):
-                            number = int(match.group("number"))
-                            new_instr = f"{match.group('prefix')}{"any" if match.group('any') else ''}{new_pos[number]}{match.group('suffix')}"
-                            prefix = f"{match.group('prefix')}{"any" if match.group('any') else ''}"
-                            str_len = 0
-                            prev_str_len = 0
-                            id = 0
-                            id2 = 0
-                            while id < len(new_pos) and str_len <= len(prefix):
-                                prev_str_len = str_len
-                                if id == id2:
-                                    str_len += len(dep_pattern[j][id])
-                                    id += 1
-                                else:
-                                    str_len += len(instr_split[id2])
-                                    id2 += 1
-                            if id == id2:
-                                instr_split[id2-1] = new_instr[prev_str_len:str_len]
-                                updated_cell[d] = '.'.join(instr_split)
-                            elif not updated_roles[j]:
-                                dep_pattern[j][id-1] = new_instr[prev_str_len:str_len]
-                                updated_roles[j] = True
-                    row[j] = ';'.join(updated_cell)
+                row[j] = ';'.join(_renumber_instruction(patterns[j], instr, new_pos) if instr else instr
+                                  for instr in cell.split(';'))
+            elif roles[j] == 'pointers':
+                row[j] = ';'.join(_renumber_pointer(instr, new_pos) for instr in cell.split(';'))
         new_table.append(row)
     return new_table
 
-def sorter(table, roles, errors, warnings):
+class _ParsedRow:
+    """
+    The tokens of one row that do not depend on the rest of the table, each with its column:
+    names, pointers, sprawl attributes and parsed dependency instructions. An instruction
+    that fails to parse keeps its ValueError, reported only if the row is used.
+    """
+    __slots__ = ("names", "pointers", "attributes", "instructions")
+
+    def __init__(self, row: Tuple[str, ...], roles: List[str], dep_pattern: List[Tuple[str, ...]]):
+        self.names: List[Tuple[int, str]] = []
+        self.pointers: List[Tuple[int, str]] = []
+        self.attributes: List[Tuple[int, str]] = []
+        self.instructions: List[Tuple[int, object]] = []
+        for j, cell in enumerate(row):
+            if not cell:
+                continue
+            if roles[j] == 'names':
+                self.names.extend((j, name) for name in cell.split(';'))
+            elif roles[j] == 'pointers':
+                self.pointers.extend((j, instr) for instr in cell.split(';'))
+            elif roles[j] == 'sprawl':
+                self.attributes.extend((j, cat) for cat in cell.split(';'))
+            elif roles[j] == 'dependencies':
+                for instr in cell.split(';'):
+                    if instr:
+                        try:
+                            self.instructions.append((j, parse_instruction(dep_pattern[j], instr)))
+                        except ValueError as e:
+                            self.instructions.append((j, e))
+
+class SortSession:
+    """
+    State kept from one run of sort_order on a collection to the next: the parsed rows,
+    keyed by their content, and the rank of every row in the last solution. A run after a
+    small edit only parses the rows that changed and repairs the previous order instead of
+    searching from scratch.
+    """
+    def __init__(self):
+        # Roles and header the cached rows were parsed with
+        self._columns: Optional[Tuple[Tuple[str, ...], Tuple[str, ...]]] = None
+        self._rows: Dict[Tuple[str, ...], _ParsedRow] = {}
+        self.ranks: Dict[Tuple[str, ...], int] = {}
+        # Rows parsed by the last run, the others came from the previous one
+        self.reparsed_rows = 0
+        # Fingerprint of the table as reordered by the last optimized sort
+        self.optimized_table: Optional[str] = None
+
+    def mark_optimized(self, table: List[List[str]], roles: List[str]):
+        """
+        Record `table` as the rows were written back after an optimized sort, so that sorting
+        it again while it does not change keeps its order (see keep_valid_initial in sort_order).
+        """
+        self.optimized_table = table_fingerprint(table, roles)
+        self.ranks = {tuple(row): rank for rank, row in enumerate(table[1:])}
+
+    def parse_rows(self, row_keys: List[Tuple[str, ...]], roles: List[str], dep_pattern: List[Tuple[str, ...]]) -> List[Optional[_ParsedRow]]:
+        """Parsed form of every row but the header, reusing the rows unchanged since the last run."""
+        columns = (tuple(roles), row_keys[0])
+        if columns != self._columns:
+            self._columns = columns
+            self._rows = {}
+            self.ranks = {}
+        rows = {}
+        parsed_rows = [None]
+        self.reparsed_rows = 0
+        for key in row_keys[1:]:
+            parsed = rows.get(key) or self._rows.get(key)
+            if parsed is None:
+                parsed = _ParsedRow(key, roles, dep_pattern)
+                self.reparsed_rows += 1
+            rows[key] = parsed
+            parsed_rows.append(parsed)
+        self._rows = rows
+        return parsed_rows
+
+    def initial_order(self, row_keys: List[Tuple[str, ...]]) -> Optional[List[int]]:
+        """
+        Order of the given rows following their ranks in the last solution, with rows not in
+        it kept right after the row preceding them. None if there was no previous solution.
+        """
+        if not self.ranks:
+            return None
+        rank = -1
+        ranks = []
+        for key in row_keys:
+            rank = self.ranks.get(key, rank)
+            ranks.append(rank)
+        return sorted(range(len(row_keys)), key=lambda x: ranks[x])
+
+class ValidationIssue(NamedTuple):
+    """An error or warning found by validate_table, with the row and column of the table it is about, if any."""
+    level: str
+    message: str
+    row: Optional[int] = None
+    column: Optional[int] = None
+
+class _IssueLog:
+    """
+    Adds the issues found by validate_table to its `errors` and `warnings` lists and passes
+    each one on to `on_issue` as soon as it is found.
+    """
+    def __init__(self, errors: List[str], warnings: List[str], on_issue: Optional[Callable[[ValidationIssue], None]]):
+        self.errors = errors
+        self.warnings = warnings
+        self.on_issue = on_issue
+
+    def add(self, issue: ValidationIssue):
+        (self.errors if issue.level == "error" else self.warnings).append(issue.message)
+        if self.on_issue is not None:
+            self.on_issue(issue)
+
+    def error(self, message: str, row: Optional[int] = None, column: Optional[int] = None):
+        self.add(ValidationIssue("error", message, row, column))
+
+    def warning(self, message: str, row: Optional[int] = None, column: Optional[int] = None):
+        self.add(ValidationIssue("warning", message, row, column))
+
+class ValidatedTable:
+    """What sort_order needs from validate_table to build the constraints of a table."""
+    __slots__ = ("row_keys", "valid_row_indexes", "to_old_indexes", "new_indexes", "instr_table", "attributes",
+                 "cat_rows", "point_to_all", "inherited_paths")
+
+    def __init__(self, row_keys, valid_row_indexes, to_old_indexes, new_indexes, instr_table, attributes, cat_rows, point_to_all,
+                 inherited_paths):
+        self.row_keys: List[Tuple[str, ...]] = row_keys
+        # Rows with a path, which get sorted, and their index among them
+        self.valid_row_indexes: List[int] = valid_row_indexes
+        self.to_old_indexes: List[int] = to_old_indexes
+        self.new_indexes: List[int] = new_indexes
+        # Instructions of each row, targets given by their index among the valid rows
+        self.instr_table: List[List[instr_struct]] = instr_table
+        self.attributes: Dict[str, List[int]] = attributes
+        # Rows without path, placed before the first row pointing to them
+        self.cat_rows: List[int] = cat_rows
+        self.point_to_all: Tuple[FrozenSet[int], ...] = point_to_all
+        # Path cells filled in through pointers, by row
+        self.inherited_paths: Dict[int, str] = inherited_paths
+
+def validate_table(table, roles, errors, warnings, stats: Optional[SolverStats] = None,
+                   session: Optional["SortSession"] = None,
+                   on_issue: Optional[Callable[[ValidationIssue], None]] = None) -> Optional[ValidatedTable]:
+    """
+    Structural checks of `table` before any solving: paths, names, pointers, attributes
+    and the format and targets of the dependencies, then the cycles between pointers and
+    between instructions that order rows. Every issue is checked, not only the first one:
+    errors and warnings are added to `errors` and `warnings`, and also passed to
+    `on_issue` as ValidationIssue with their row and column as soon as they are found.
+    Returns the data sort_order needs to build the constraints, or None if there are errors.
+    Path cells inherited through pointers are filled in `table` in place.
+    """
+    if stats is None:
+        stats = SolverStats()
+    if session is None:
+        session = SortSession()
+    log = _IssueLog(errors, warnings, on_issue)
+    parse_start = time.perf_counter()
+    dep_pattern = [tuple(cell.split('.')) for cell in table[0]]
+    row_keys = [tuple(row) for row in table]
+    parsed_rows = session.parse_rows(row_keys, roles, dep_pattern)
     alph = generate_unique_strings(max(len(roles), len(table)))
     path_index = roles.index('path') if 'path' in roles else -1
     if path_index != -1:
@@ -340,111 +1300,96 @@ def sorter(table, roles, errors, warnings):
             cell = row[path_index]
             if cell:
                 if not cell.strip():
-                    warnings.append(f"Warning in row {i+1}, column {alph[path_index]}: only whitespace in cell")
+                    log.warning(f"Warning in row {i+1}, column {alph[path_index]}: only whitespace in cell", i + 1, path_index)
                 if not re.match(r'^(https?://|file://)', cell):
-                    warnings.append(f"Warning in row {i+1}, column {alph[path_index]}: {cell!r} is not a valid URL or local path")
+                    log.warning(f"Warning in row {i+1}, column {alph[path_index]}: {cell!r} is not a valid URL or local path", i + 1, path_index)
     pointed_by = [[] for _ in range(len(table))]
     point_to = [[] for _ in range(len(table))]
     names = [[] for _ in range(len(table))]
-    for i, row in enumerate(table[1:], start=1):
-        for j, cell in enumerate(row):
-            if roles[j] == 'names' and cell:
-                cell_list = cell.split(';')
-                for name in cell_list:
-                    if name not in names[i]:
-                        names[i].append(name)
-                    else:
-                        warnings.append(f"Redundant name {name!r} in row {i}, column {alph[j]}")
-    for i, row in enumerate(table[1:], start=1):
-        for j, cell in enumerate(row):
-            if roles[j] == 'pointers':
-                if cell:
-                    cell_list = cell.split(';')
-                    for instr in cell_list:
-                        try:
-                            k = int(instr)
-                            if k < 1 or k > len(table)-1:
-                                errors.append(f"Error in row {i}, column {alph[j]}: {instr!r} points to an invalid row {k}")
-                                return table
-                            else:
-                                pointed_by[k].append(i)
-                                point_to[i].append(k)
-                        except ValueError:
-                            for ii, rrow in enumerate(names[1:], start=1):
-                                if instr in rrow:
-                                    pointed_by[ii].append(i)
-                                    point_to[i].append(ii)
-                                    break
-                            else:
-                                errors.append(f"Error in row {i+1}, column {alph[j]}: row {instr!r} does not exist")
-                                return table
-    # find a cycle
-    def dfs(node, visited, stack):
-        visited.add(node)
-        stack.add(node)
-        for neighbor in point_to[node]:
-            if neighbor not in visited:
-                if dfs(neighbor, visited, stack):
-                    return True
-            elif neighbor in stack:
-                return True
-        stack.remove(node)
-        return False
-    visited = set()
-    stack = set()
+    # First row carrying each name, used for every lookup by name
+    name_rows = {}
+    for i in range(1, len(table)):
+        for j, name in parsed_rows[i].names:
+            if name not in names[i]:
+                names[i].append(name)
+                name_rows.setdefault(name, i)
+            else:
+                log.warning(f"Redundant name {name!r} in row {i}, column {alph[j]}", i, j)
     for i in range(1, len(table)):
-        if i not in visited:
-            if dfs(i, visited, stack):
-                print(f"Cycle found starting at row {i}")
-                return table
+        for j, instr in parsed_rows[i].pointers:
+            try:
+                k = int(instr)
+                if k < 1 or k > len(table)-1:
+                    log.error(f"Error in row {i}, column {alph[j]}: {instr!r} points to an invalid row {k}", i, j)
+                else:
+                    pointed_by[k].append(i)
+                    point_to[i].append(k)
+            except ValueError:
+                if instr in name_rows:
+                    ii = name_rows[instr]
+                    pointed_by[ii].append(i)
+                    point_to[i].append(ii)
+                else:
+                    log.error(f"Error in row {i}, column {alph[j]}: row {instr!r} does not exist", i, j)
+    stats.add_phase_time("parse", time.perf_counter() - parse_start)
+    with stats.phase("cycles"):
+        for component in find_cycles(point_to):
+            log.error(f"Error: pointer cycle between rows {', '.join(map(str, component))}", component[0])
+    parse_start = time.perf_counter()
     attributes = {}
     attributes_table = [[] for _ in range(len(table))]
-    for i, row in enumerate(table[1:], start=1):
-        for j, cell in enumerate(row):
-            if roles[j] == 'sprawl':
-                if not cell:
+    for i in range(1, len(table)):
+        for j, cat in parsed_rows[i].attributes:
+            if cat not in attributes:
+                if not cat:
+                    log.error(f"Error in row {i}, column {alph[j]}: empty attribute name", i, j)
                     continue
-                cell_list = cell.split(';')
-                for cat in cell_list:
-                    if cat not in attributes:
-                        if not cat:
-                            errors.append(f"Error in row {i}, column {alph[j]}: empty attribute name")
-                            return table
-                        attributes[cat] = []
-                    if i not in attributes[cat]:
-                        attributes[cat].append(i)
-                        attributes_table[i].append(cat)
-                    else:
-                        warnings.append(f"Redundant attribute {cat!r} in row {i}, column {alph[j]}")
+                attributes[cat] = []
+            if cat not in attributes_table[i]:
+                attributes[cat].append(i)
+                attributes_table[i].append(cat)
+            else:
+                log.warning(f"Redundant attribute {cat!r} in row {i}, column {alph[j]}", i, j)
     for cat in attributes:
-        for i, row in enumerate(names[1:], start=1):
-            if cat in row:
-                errors.append(f"Error: attribute {cat!r} in row {attributes[cat][0]} conflicts with name in row {i}")
-                return table
-    pointed_givers = [dict() for _ in range(len(table))]
-    pointed_givers_path = [0 for _ in range(len(table))]
+        if cat in name_rows:
+            log.error(f"Error: attribute {cat!r} in row {attributes[cat][0]} conflicts with name in row {name_rows[cat]}", attributes[cat][0])
+    # Rows inherit the attributes of every row they point to, directly or transitively. The
+    # closure is computed in topological order, targets before the rows pointing to them; rows
+    # on a pointer cycle are left out of it.
+    order, reach = pointer_closure(tuple(tuple(targets) for targets in point_to))
+    own_attributes = [list(cats) for cats in attributes_table]
+    inherited = [dict() for _ in range(len(table))]
+    for i in order:
+        for k in set(point_to[i]):
+            for cat in own_attributes[k]:
+                inherited[i].setdefault(cat, k)
+            for cat, giver in inherited[k].items():
+                inherited[i].setdefault(cat, giver)
+    for i in range(1, len(table)):
+        for cat, giver in sorted(inherited[i].items(), key=lambda item: item[1]):
+            if cat in own_attributes[i]:
+                log.warning(f"Redundant attribute {cat!r} in row {i} already given by row {giver}", i)
+            else:
+                attributes_table[i].append(cat)
+                attributes[cat].append(i)
     pointed_by_all = [list() for i in range(len(table))]
-    point_to_all = [list() for i in range(len(table))]
-    for i, row in enumerate(pointed_by_all[1:], start=1):
-        to_check = list(pointed_by[i])
-        while to_check:
-            current = to_check.pop()
-            if current not in row:
-                row.append(current)
-                point_to_all[current].append(i)
-                for cat in attributes_table[i]:
-                    if cat not in attributes_table[current]:
-                        attributes_table[current].append(cat)
-                        attributes[cat].append(current)
-                        pointed_givers[current][cat] = i
-                    elif cat not in pointed_givers[current]:
-                        warnings.append(f"Redundant attribute {cat!r} in row {current} already given by row {i}")
-                if path_index != -1 and table[i][path_index]:
-                    if table[current][path_index] and not pointed_givers_path[current]:
-                        warnings.append(f"Warning in row {current}, column {alph[path_index]}: path already given by row {i}")
-                    table[current][path_index] = table[i][path_index]
-                    pointed_givers_path[current] = i
-            to_check.extend(pointed_by[current])
+    for i, targets in enumerate(reach):
+        for k in targets:
+            pointed_by_all[k].append(i)
+    # Paths are handed down row after row: a row with a path, its own or one it got from a
+    # row before it, gives it to every row pointing to it, so the last giver of a row wins
+    # and a chain of pointers ends up with the path of the row at its end
+    path_giver = [0] * len(table)
+    inherited_paths = {}
+    if path_index != -1:
+        for i in range(1, len(table)):
+            if table[i][path_index]:
+                for k in pointed_by_all[i]:
+                    if table[k][path_index] and not path_giver[k]:
+                        log.warning(f"Warning in row {k}, column {alph[path_index]}: path already given by row {i}", k, path_index)
+                    table[k][path_index] = inherited_paths[k] = table[i][path_index]
+                    path_giver[k] = i
+    point_to_all = reach
     valid_row_indexes = []
     new_indexes = list(range(len(table)))
     to_old_indexes = []
@@ -466,118 +1411,176 @@ def sorter(table, roles, errors, warnings):
         if not attributes[cat]:
             del attributes[cat]
         elif len(attributes[cat]) == 1:
-            warnings.append(f"Warning: attribute {cat!r} only in row {attributes[cat][0]}, consider removing it")
+            log.warning(f"Warning: attribute {cat!r} only in row {attributes[cat][0]}, consider removing it", attributes[cat][0])
             del attributes[cat]
     for row in pointed_by_all:
         row[:] = list(filter(lambda x: staying[x], row))
     instr_table = [[] for _ in range(len(table))]
-    dep_pattern = [cell.split('.') for cell in table[0]]
-    for i, row in enumerate(table[1:], start=1):
+    for i in range(1, len(table)):
         if not staying[i] and not pointed_by[i]:
             continue
-        for j, cell in enumerate(row):
-            if roles[j] == 'dependencies' and cell:
-                cell_list = cell.split(';')
-                for instr in cell_list:
-                    if instr:
-                        instr_split = instr.split('.')
-                        if len(instr_split) != len(dep_pattern[j])-1:
-                            errors.append(f"Error in row {i+1}, column {alph[j]}: {instr!r} does not match dependencies pattern {dep_pattern[j]!r}")
-                            return table
-                        if dep_pattern[j]:
-                            instr = dep_pattern[j][0] + ''.join([instr_split[i]+dep_pattern[j][i+1] for i in range(len(instr_split))])
-                        match = re.match(PATTERN_DISTANCE, instr)
-                        intervals = []
-                        if instr_type := not match:
-                            match = re.match(PATTERN_AREAS, instr)
-                            if not match:
-                                errors.append(f"Error in row {i+1}, column {alph[j]}: {instr!r} does not match expected format")
-                                return table
-                            intervals = get_intervals(instr)
-                        numbers = []
-                        if match.group("number"):
-                            number = int(match.group("number"))
-                            if number == 0 or number > len(table):
-                                errors.append(f"Error in row {i}, column {alph[j]}: invalid number.")
-                                return table
-                            if staying[number]:
-                                numbers.append(number)
-                            for pointer in pointed_by_all[number]:
-                                numbers.append(pointer)
-                        elif name := match.group("name"):
-                            if name in attributes:
-                                for r in attributes[name]:
-                                    numbers.append(r)
-                            else:
-                                for ii, rrow in enumerate(names[1:], start=1):
-                                    if name in rrow:
-                                        number = ii
-                                        if staying[number]:
-                                            numbers.append(number)
-                                        for pointer in pointed_by_all[number]:
-                                            numbers.append(pointer)
-                                        break
-                                else:
-                                    errors.append(f"Error in row {i+1}, column {alph[j]}: attribute {name!r} does not exist")
-                                    return table
-                        else:
-                            errors.append(f"Error in row {i+1}, column {alph[j]}: {instr!r} does not match expected format")
-                            return table
-                        numbers = list(map(lambda x: new_indexes[x], numbers))
-                        instr_table[i].append(instr_struct(instr_type, match.group("any"), numbers, intervals))
-    for i in valid_row_indexes:
-        for j in point_to_all[i]:
-            instr_table[i] = list(set(instr_table[i] + instr_table[j]))
-    # detect cycles in instr_table
-    def has_cycle(instr_table, visited, stack, node, after=True):
-        visited.add(node)
-        stack.add(node)
-        for neighbor in instr_table[node]:
-            if neighbor.any and not neighbor.instr_type and neighbor.intervals[0] != (-float("inf"), -1) if after else neighbor.intervals[-1] != (1, float("inf")):
+        for j, parsed in parsed_rows[i].instructions:
+            if isinstance(parsed, ValueError):
+                log.error(f"Error in row {i}, column {alph[j]}: {parsed}", i, j)
                 continue
-            for target in neighbor.numbers:
-                if target not in visited:
-                    if has_cycle(instr_table, visited, stack, target, after):
-                        return True
-                elif target in stack and len(stack) > 1:
-                    return True
-        stack.remove(node)
-        return False
-    visited = set()
-    stack = set()
-    for p in [0, 1]:
-        for i in valid_row_indexes:
-            if has_cycle(instr_table, visited, stack, i, p):
-                errors.append(f"Cycle detected: {(' after ' if p else ' before ').join([str(to_old_indexes[i])]+[str(to_old_indexes[k]) for k in stack])}")
-                return table
-    instr_table_int = []
+            numbers = []
+            if parsed.number is not None:
+                number = parsed.number
+                if number == 0 or number >= len(table):
+                    log.error(f"Error in row {i}, column {alph[j]}: invalid number.", i, j)
+                    continue
+                if staying[number]:
+                    numbers.append(number)
+                for pointer in pointed_by_all[number]:
+                    numbers.append(pointer)
+            elif name := parsed.name:
+                if name in attributes:
+                    for r in attributes[name]:
+                        numbers.append(r)
+                elif name in name_rows:
+                    number = name_rows[name]
+                    if staying[number]:
+                        numbers.append(number)
+                    for pointer in pointed_by_all[number]:
+                        numbers.append(pointer)
+                else:
+                    log.error(f"Error in row {i}, column {alph[j]}: attribute {name!r} does not exist", i, j)
+                    continue
+            else:
+                log.error(f"Error in row {i}, column {alph[j]}: {parsed.instruction!r} does not match expected format", i, j)
+                continue
+            numbers = list(map(lambda x: new_indexes[x], numbers))
+            instr_table[i].append(instr_struct(parsed.instr_type, parsed.any, numbers, parsed.intervals))
     for i in valid_row_indexes:
-        instr_table_int.append(instr_table[i])
-    sorter = ConstraintSorter(alph[:len(valid_row_indexes)])
-    go(alph, instr_table_int, sorter)
-    for cat in attributes:
-        sorter.add_group_maximize(set(map(lambda x: new_indexes[x], attributes[cat])))
+        if point_to_all[i]:
+            merged = set(instr_table[i])
+            for j in point_to_all[i]:
+                merged.update(instr_table[j])
+            instr_table[i] = list(merged)
+    stats.add_phase_time("parse", time.perf_counter() - parse_start)
+    with stats.phase("cycles"):
+        # Instructions that force a row after (or before) its targets must not contradict each other.
+        # Instructions skipped above only remove edges, so the cycles found here are real ones.
+        must_precede = [set() for _ in valid_row_indexes]
+        for x, i in enumerate(valid_row_indexes):
+            for instr in instr_table[i]:
+                if not instr.instr_type or instr.any:
+                    continue
+                after = any(start == -float("inf") and end >= -1 for start, end in instr.intervals)
+                before = any(start <= 1 and end == float("inf") for start, end in instr.intervals)
+                for y in instr.numbers:
+                    if y == x:
+                        continue
+                    if after:
+                        must_precede[y].add(x)
+                    if before:
+                        must_precede[x].add(y)
+        for component in find_cycles(must_precede):
+            log.error(f"Cycle detected: rows {', '.join(str(to_old_indexes[x]) for x in component)} must each come after another one of them",
+                      to_old_indexes[component[0]])
+    if errors:
+        return None
+    return ValidatedTable(row_keys, valid_row_indexes, to_old_indexes, new_indexes, instr_table, attributes, cat_rows, point_to_all,
+                          inherited_paths)
+
+def sort_order(table, roles, errors, warnings, stats: Optional[SolverStats] = None, solve_options: Optional[dict] = None,
+               session: Optional["SortSession"] = None,
+               on_issue: Optional[Callable[[ValidationIssue], None]] = None, cancel=None,
+               cache: Optional[SolutionCache] = None) -> Optional[List[int]]:
+    """
+    New order of the rows of `table` (as old row indexes, header first), or None with the
+    reason in `errors`. The table is first checked by validate_table, which reports all its
+    issues to `on_issue` as they are found; nothing is solved if any of them is an error.
+    Phase timings and solver counters accumulate in `stats`, and `solve_options` are passed
+    on to ConstraintSorter.solve. With a `session` from the previous run on the same
+    collection, only the rows that changed are parsed again and the solver is warm-started
+    from the previous order. Setting the threading.Event `cancel` stops the run at its next
+    checkpoint with SortCancelled.
+    With a `cache`, a table whose relevant columns did not change since it was last seen
+    skips validation (its issues are reported again) and the building of its constraints,
+    and the solve starts from its last valid arrangement unless the initial order is valid.
+    The `keep_valid_initial` solve option only keeps the order of a table the session marked
+    as optimized (SortSession.mark_optimized) and that did not change since; a valid order
+    of any other table is optimized further.
+    """
+    if stats is None:
+        stats = SolverStats()
+    if session is None:
+        session = SortSession()
+    fingerprint = table_fingerprint(table, roles) if cache is not None or session.optimized_table is not None else None
+    unchanged_since_optimized = fingerprint is not None and fingerprint == session.optimized_table
+    cached = cache.get(fingerprint) if cache is not None else None
+    if cached is not None:
+        log = _IssueLog(errors, warnings, on_issue)
+        for issue in cached.issues:
+            log.add(issue)
+        if cached.validated is None:
+            return None
+        validated = cached.validated
+        for i, path in validated.inherited_paths.items():
+            table[i][roles.index('path')] = path
+        sorter = cached.sorter
+        sorter.stats = stats
+    else:
+        issues = []
+
+        def record(issue):
+            issues.append(issue)
+            if on_issue is not None:
+                on_issue(issue)
+
+        validated = validate_table(table, roles, errors, warnings, stats, session, record)
+        if validated is None:
+            if cache is not None:
+                cache.put(fingerprint, CachedSolution(issues))
+            return None
+    _check_cancelled(cancel)
+    valid_row_indexes = validated.valid_row_indexes
+    to_old_indexes = validated.to_old_indexes
+    new_indexes = validated.new_indexes
+    instr_table = validated.instr_table
+    attributes = validated.attributes
+    cat_rows = list(validated.cat_rows)
+    point_to_all = validated.point_to_all
+    if cached is None:
+        with stats.phase("constraints"):
+            instr_table_int = []
+            for i in valid_row_indexes:
+                instr_table_int.append(instr_table[i])
+            # Elements are labelled by their index among the valid rows
+            sorter = ConstraintSorter(list(range(len(valid_row_indexes))), stats)
+            go(sorter.elements, instr_table_int, sorter)
+            for cat in attributes:
+                _check_cancelled(cancel)
+                sorter.add_group_maximize(set(map(lambda x: new_indexes[x], attributes[cat])))
+        if cache is not None:
+            cached = CachedSolution(issues, validated, sorter)
+            cache.put(fingerprint, cached)
     
     # Solve the problem
-    print("Solving constraint-based sorting problem...")
-    solution = sorter.solve(max_iterations=2000)
+    valid_keys = [validated.row_keys[i] for i in valid_row_indexes]
+    # Start from the previous solution if there is one, else from the current order of the rows
+    initial = session.initial_order(valid_keys)
+    if initial is None:
+        initial = list(range(len(valid_row_indexes)))
+    solve_options = {"max_iterations": 2000, "initial": initial, "cancel": cancel, **(solve_options or {})}
+    if not unchanged_since_optimized:
+        solve_options["keep_valid_initial"] = False
+    if cached is not None and cached.arrangement is not None and not sorter.is_valid_placement(initial):
+        # Only an initial order that was already valid is kept as is; this one still gets optimized
+        solve_options.update(initial=cached.arrangement, keep_valid_initial=False)
+    with stats.phase("solve"):
+        solution = sorter.solve(**solve_options)
+    _check_cancelled(cancel)
     
     if not solution:
-        errors.append("No valid solution found!")
-        return table
-    elif type(solution) is string:
-        errors.append(f"Error when sorting: {solution!r}")
-        return table
-    print(f"Solution found: {solution}")
-    print(f"Is valid: {sorter.is_valid_placement(solution)}")
-    print(f"Distance score: {sorter.calculate_distance_score(solution)}")
-    
-    # Show positions for clarity
-    print("\nPositions:")
-    for i, elem in enumerate(solution):
-        print(f"Position {i}: {elem}")
+        errors.append(" ".join(["No valid solution found!"] + sorter.last_violations))
+        return None
 
-    res = [0] + [to_old_indexes[alph.index(elem)] for elem in solution]
+    session.ranks = {valid_keys[elem]: rank for rank, elem in enumerate(solution)}
+    if cache is not None:
+        cache.put(fingerprint, CachedSolution(cached.issues, validated, sorter, list(solution)))
+    res = [0] + [to_old_indexes[elem] for elem in solution]
     i = 0
     while i < len(res):
         d = 0
@@ -591,9 +1594,37 @@ def sorter(table, roles, errors, warnings):
                 d += 1
         i += 1
     res.extend(cat_rows)
-    new_table = order_table(res, table, roles, dep_pattern)
+    return res
+
+def sorter(table, roles, errors, warnings, stats: Optional[SolverStats] = None, solve_options: Optional[dict] = None,
+           session: Optional[SortSession] = None, on_issue: Optional[Callable[[ValidationIssue], None]] = None, cancel=None,
+           cache: Optional[SolutionCache] = None):
+    if stats is None:
+        stats = SolverStats()
+    res = sort_order(table, roles, errors, warnings, stats, solve_options, session, on_issue, cancel, cache)
+    if res is None:
+        return table
+    dep_pattern = [cell.split('.') for cell in table[0]]
+    with stats.phase("order_table"):
+        new_table = order_table(res, table, roles, dep_pattern)
     return new_table
 
+def find_valid_sortings(table, roles, stats: Optional[SolverStats] = None, session: Optional[SortSession] = None,
+                        solve_options: Optional[dict] = None, on_issue: Optional[Callable[[ValidationIssue], None]] = None,
+                        cancel=None, cache: Optional[SolutionCache] = None):
+    """
+    Entry point of the background tasks. Returns the errors as one string, or a list
+    holding the new order of the rows of `table` (as old row indexes) and the warnings.
+    Raises SortCancelled once `cancel` is set. `table` itself is left untouched; see
+    sort_order for the other arguments.
+    """
+    errors = []
+    warnings = []
+    res = sort_order([list(row) for row in table], roles, errors, warnings, stats, solve_options, session, on_issue, cancel, cache)
+    if res is None:
+        return "\n".join(errors) or "No valid solution found!"
+    return [res, warnings]
+
 
 if __name__ == "__main__":
     #take from clipboard
@@ -0,0 +1,149 @@
+import atexit
+import copy
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from .solver_stats import SolverStats
+
+# Columns whose content changes the constraints or the solution of a table
+RELEVANT_ROLES = ("names", "pointers", "dependencies", "sprawl", "path")
+
+# Saved with the entries; files of another version are ignored when the layout of the
+# cached objects changes
+CACHE_VERSION = 2
+
+
+def table_fingerprint(table: List[List[str]], roles: List[str]) -> str:
+    """Digest of the roles and of the cells of `table` in the relevant columns, header included."""
+    columns = [j for j, role in enumerate(roles) if role in RELEVANT_ROLES]
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update("\x1f".join(roles).encode())
+    for row in table:
+        digest.update(("\x1e" + "\x1f".join(row[j] if j < len(row) else "" for j in columns)).encode())
+    return digest.hexdigest()
+
+
+class CachedSolution:
+    """
+    What sort_order found for one table: the issues of its validation and, if there was
+    no error, the validated table, the ConstraintSorter holding its constraints and the
+    last valid arrangement of its elements (None until one is found).
+    """
+    __slots__ = ("issues", "validated", "sorter", "arrangement")
+
+    def __init__(self, issues, validated=None, sorter=None, arrangement: Optional[List[int]] = None):
+        self.issues = issues
+        self.validated = validated
+        self.sorter = sorter
+        self.arrangement = arrangement
+
+
+class SolutionCache:
+    """
+    Least recently used CachedSolution entries by table fingerprint, shared by the
+    background threads. With a `path`, the entries are loaded from it on creation and
+    written back with pickle in the background, at most once every `save_delay` seconds
+    while entries are stored, and by flush() or at exit for the last ones.
+    """
+    def __init__(self, max_entries: int = 16, path: Optional[str] = None, save_delay: float = 5.0):
+        self.max_entries = max_entries
+        self.path = path
+        self.save_delay = save_delay
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, CachedSolution]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Held while writing the file, so that the timer and flush() do not write it together
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self._save_timer: Optional[threading.Timer] = None
+        if path is not None:
+            self.load()
+            atexit.register(self.flush)
+
+    def get(self, fingerprint: str) -> Optional[CachedSolution]:
+        """
+        The entry of a table, marked as the most recently used, or None. The sorter of the
+        entry is a shallow copy, so that runs sharing its constraints keep their own stats.
+        """
+        with self._lock:
+            entry = self._entries.get(fingerprint)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(fingerprint)
+            self.hits += 1
+        return CachedSolution(entry.issues, entry.validated, copy.copy(entry.sorter), entry.arrangement)
+
+    def put(self, fingerprint: str, entry: CachedSolution):
+        """
+        Store the entry of a table, evicting the least recently used ones beyond `max_entries`.
+        The sorter is stored as a shallow copy without the stats of the run that built it.
+        """
+        if entry.sorter is not None:
+            entry.sorter = copy.copy(entry.sorter)
+            entry.sorter.stats = SolverStats()
+            entry.sorter.cancel = None
+        with self._lock:
+            self._entries[fingerprint] = entry
+            self._entries.move_to_end(fingerprint)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._schedule_save()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._schedule_save()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def load(self):
+        """Replace the entries with those saved at `path`; a missing or unreadable file leaves the cache empty."""
+        try:
+            with open(self.path, "rb") as f:
+                version, entries = pickle.load(f)
+            if version != CACHE_VERSION:
+                raise ValueError(f"version {version!r} instead of {CACHE_VERSION}")
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            # Entries saved by another version of the sorter are not worth failing for
+            print(f"Ignoring solution cache {self.path!r}: {e}")
+            return
+        with self._lock:
+            self._entries = OrderedDict(entries)
+
+    def flush(self):
+        """Write the entries stored since the last save to `path` now."""
+        with self._save_lock:
+            with self._lock:
+                if self._save_timer is not None:
+                    self._save_timer.cancel()
+                    self._save_timer = None
+                if not self._dirty:
+                    return
+                self._dirty = False
+                entries: Dict[str, CachedSolution] = dict(self._entries)
+            # Entries are replaced, never modified, so the copy is pickled without the lock
+            # and does not hold up the threads storing new ones. It is written next to the
+            # file first, so that a crash does not leave it truncated.
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, "wb") as f:
+                pickle.dump((CACHE_VERSION, entries), f)
+            os.replace(temp_path, self.path)
+
+    def _schedule_save(self):
+        """Mark the entries as changed and start the save timer if it is not running; lock held."""
+        if self.path is None:
+            return
+        self._dirty = True
+        if self._save_timer is None:
+            self._save_timer = threading.Timer(self.save_delay, self.flush)
+            self._save_timer.daemon = True
+            self._save_timer.start()
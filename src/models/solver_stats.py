@@ -0,0 +1,75 @@
+import json
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+class SolverStats:
+    """
+    Counters and timings of a sorting run, filled in by sorter() and ConstraintSorter.
+    `hook`, if given, is called with the stats every time a phase ends, e.g. to forward
+    them to the UI while the run goes on.
+    """
+    def __init__(self, hook: Optional[Callable[["SolverStats"], None]] = None):
+        self.hook = hook
+        # Placement attempts and abandoned branches of the systematic search
+        self.nodes = 0
+        self.backtracks = 0
+        # Individual constraint evaluations, incremental or vectorized
+        self.constraint_checks = 0
+        # Swaps proposed and applied by the optimizers
+        self.moves_tried = 0
+        self.moves_accepted = 0
+        # Seconds spent in each phase, summed over repeated phases
+        self.phase_times: Dict[str, float] = {}
+        # (seconds since the optimizer started, best score) each time the best score improved
+        self.score_history: List[Tuple[float, float]] = []
+
+    def __getstate__(self):
+        # The hook usually closes over Qt objects and is not sent to worker processes
+        state = self.__dict__.copy()
+        state["hook"] = None
+        return state
+
+    def add_phase_time(self, name: str, seconds: float):
+        """Account `seconds` to phase `name` and notify the hook."""
+        self.phase_times[name] = self.phase_times.get(name, 0.0) + seconds
+        if self.hook is not None:
+            self.hook(self)
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time the enclosed block as phase `name`, even if it exits with an exception."""
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.add_phase_time(name, time.perf_counter() - start)
+
+    def merge(self, other: "SolverStats"):
+        """
+        Add the counters and phase times of another run, such as a restart in a worker
+        process. Phase times of parallel runs add up to CPU time rather than wall time.
+        """
+        self.nodes += other.nodes
+        self.backtracks += other.backtracks
+        self.constraint_checks += other.constraint_checks
+        self.moves_tried += other.moves_tried
+        self.moves_accepted += other.moves_accepted
+        for name, seconds in other.phase_times.items():
+            self.phase_times[name] = self.phase_times.get(name, 0.0) + seconds
+
+    def to_dict(self) -> dict:
+        return {
+            "nodes": self.nodes,
+            "backtracks": self.backtracks,
+            "constraint_checks": self.constraint_checks,
+            "moves_tried": self.moves_tried,
+            "moves_accepted": self.moves_accepted,
+            "phase_times": dict(self.phase_times),
+            "score_history": [list(point) for point in self.score_history],
+        }
+
+    def dump_json(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
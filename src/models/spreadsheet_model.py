@@ -60,6 +60,8 @@ class SpreadsheetModel(QAbstractTableModel):
         self._data_lock = threading.Lock()
         self.condition = threading.Condition(self._data_lock)
         self.imports_loaded = threading.Event()
+        # Cancellation token of the task each background thread is running, by task id
+        self._cancel_tokens = {}
         self._executor = ThreadPoolExecutor(max_workers=2)
         self._selected_row = -1
         self._selected_column = -1
@@ -107,7 +109,7 @@ class SpreadsheetModel(QAbstractTableModel):
 
     @Slot(int, result=int)
     def columnWidth(self, column):
-        if 0 <= column < (len(self._data[0]) if self._data else 0):
+        if 0 <= column < self._data.column_count:
             prevWidth = self._columnWidths[column - 1] if column > 0 else 0
             return self._columnWidths[column] - prevWidth
         return self.default_width + self.horizontal_padding * 2
@@ -261,10 +263,7 @@ class SpreadsheetModel(QAbstractTableModel):
         row = index.row()
         column = index.column()
         if role == Qt.DisplayRole:
-            if row < len(self._data) and column < (len(self._data[0]) if self._data else 0):
-                return self._data[row][column]
-            else:
-                return ""
+            return self._data.get(row, column)
         elif role == Qt.BackgroundRole:
             return self.get_cell_color(column)
         elif role == Qt.DecorationRole:
@@ -273,81 +272,103 @@ class SpreadsheetModel(QAbstractTableModel):
             return int(self._selected_row == row or self._selected_column == column)
         return None
 
+    def _cancelRunningTask(self, tasks):
+        """Stop the task running at the head of `tasks` if it is for the current collection."""
+        if tasks and tasks[0]["collectionName"] == self.collectionName and tasks[0]["id"] in self._cancel_tokens:
+            self._cancel_tokens[tasks[0]["id"]].set()
+
     def _appendChecking(self):
         with self.condition:
-            for i, task in enumerate(self.checkings_list[1:], start=1):
+            self._cancelRunningTask(self.checkings_list)
+            # The running sort is for data that changed, its result would undo the edit
+            self._cancelRunningTask(self._collections.sortings_list)
+            for task in self.checkings_list[1:]:
                 if task["collectionName"] == self.collectionName:
-                    del self.checkings_list[i]
-                    return
-            task_object = {"collectionName": self.collectionName, "id": random.random()}
-            self.checkings_list.insert(bool(self.checkings_list), task_object)
-            self.condition.notify_all()
+                    # Already queued, it will check the latest data
+                    break
+            else:
+                task_object = {"collectionName": self.collectionName, "id": random.random()}
+                self.checkings_list.insert(bool(self.checkings_list), task_object)
+                self.condition.notify_all()
             self.save_to_file()
 
+    def _writeCells(self, cells, focus_col):
+        """
+        Write the (row, column, value) `cells`, with the data lock held. The rows and columns
+        they reach are added first, and the empty ones are removed once at the end if a cell
+        of the last row or column was cleared. The role shown in the combo box follows the
+        column `focus_col`. Returns the first and last columns whose background changed, or None.
+        """
+        prev_role = self._roles[focus_col] if 0 <= focus_col < len(self._roles) else RoleTypes.NAMES
+        max_row = max(row for row, _, _ in cells)
+        max_col = max(col for _, col, _ in cells)
+        if max_row >= len(self._data):
+            for r in range(len(self._data), max_row + 1):
+                prevHeight = self._rowHeights[-1] if r else 0
+                self._rowHeights.append(prevHeight + self.rowHeight(-1))
+            self._data.add_rows(max_row + 1 - len(self._data))
+        prev_col_nb = self._data.column_count
+        changed_cols = None
+        if max_col >= prev_col_nb:
+            self._data.add_columns(max_col + 1 - prev_col_nb)
+            for j in range(prev_col_nb, max_col + 1):
+                prevWidth = self._columnWidths[-1] if len(self._columnWidths) else 0
+                self._columnWidths.append(prevWidth + self.columnWidth(-1))
+                self._roles.append(RoleTypes.ATTRIBUTES)
+            changed_cols = (prev_col_nb, max_col)
+            self.signal.emit({"type": "selected_cell_changed", "value": self._role_types.index(RoleTypes.ATTRIBUTES)})
+
+        clears_last_row = clears_last_col = False
+        for row, col, value in cells:
+            self._data.set(row, col, value)
+            if value == "":
+                clears_last_row |= row == len(self._data) - 1
+                clears_last_col |= col == self._data.column_count - 1
+        col_nb = self._data.column_count
+        removed_cols = []
+        if clears_last_row:
+            for r in self._data.remove_empty_rows():
+                self._rowHeights.pop(r)
+            if not self._data and self._roles:
+                # Without rows, the data has no column left either
+                removed_cols = list(range(len(self._roles) - 1, -1, -1))
+                self._columnWidths.clear()
+                self._roles.clear()
+        if clears_last_col and self._data:
+            removed_cols = self._data.remove_empty_columns()
+            for c in removed_cols:
+                self._columnWidths.pop(c)
+                self._roles.pop(c)
+        if removed_cols:
+            # The columns after the first removed one move to the left
+            changed_cols = (min(removed_cols[-1], changed_cols[0]) if changed_cols else removed_cols[-1], col_nb - 1)
+            if prev_role != RoleTypes.NAMES:
+                self.signal.emit({"type": "selected_cell_changed", "value": self._role_types.index(RoleTypes.NAMES)})
+        return changed_cols
+
+    def _setCells(self, cells, focus_col):
+        """Write `cells` as _writeCells does, then resize the view and notify it once."""
+        if not cells:
+            return
+        with self._data_lock:
+            changed_cols = self._writeCells(cells, focus_col)
+            self.verticalScroll(self._verticalScrollPosition, self._verticalScrollSize, self._tableViewContentY, self._tableViewHeight)
+            self.horizontalScroll(self._horizontalScrollPosition, self._horizontalScrollSize, self._tableViewContentX, self._tableViewWidth)
+            first_row = min(row for row, _, _ in cells)
+            last_row = max(row for row, _, _ in cells)
+            first_col = min(col for _, col, _ in cells)
+            last_col = max(col for _, col, _ in cells)
+            roles = [Qt.EditRole, Qt.DisplayRole]
+            if changed_cols:
+                first_row, last_row = 0, self._rows_nb - 1
+                first_col, last_col = min(first_col, changed_cols[0]), max(last_col, changed_cols[1])
+                roles.append(Qt.BackgroundRole)
+            self.dataChanged.emit(self.index(first_row, first_col), self.index(last_row, last_col), roles)
+        self._appendChecking()
+
     def setData(self, index: QModelIndex, value, role=Qt.EditRole):
         if role == Qt.EditRole and index.isValid():
-            row, col = index.row(), index.column()
-            with self._data_lock:
-                prev_role = self._roles[col] if col < len(self._roles) else RoleTypes.NAMES
-                if row >= len(self._data):
-                    for r in range(len(self._data), row + 1):
-                        prevHeight = self._rowHeights[-1] if self._data else 0
-                        self._rowHeights.append(prevHeight + self.rowHeight(-1))
-                        self._data.append([""] * (len(self._data[0]) if self._data else 0))
-                elif row == len(self._data) - 1 and value == "":
-                    if col < len(self._data[0]):
-                        self._data[row][col] = ""
-                    prev_col_nb = len(self._data[0])
-                    for r in range(row, -1, -1):
-                        if self._data[r] == [""] * len(self._data[0]):
-                            self._data.pop(r)
-                            self._rowHeights.pop(r)
-                if self._data:
-                    if col >= len(self._data[0]):
-                        prev_col_nb = len(self._data[0])
-                        for r in self._data:
-                            for _ in range(prev_col_nb, col + 1):
-                                r.append("")
-                        for j in range(prev_col_nb, col + 1):
-                            prevWidth = self._columnWidths[-1] if len(self._columnWidths) else 0
-                            self._columnWidths.append(prevWidth + self.columnWidth(-1))
-                            self._roles.append(RoleTypes.ATTRIBUTES)
-                        index = self.index(0, prev_col_nb)
-                        index2 = self.index(self._rows_nb - 1, col)
-                        self.dataChanged.emit(index, index2, [Qt.BackgroundRole])
-                        self.signal.emit({"type": "selected_cell_changed", "value": self._role_types.index(RoleTypes.ATTRIBUTES)})
-                    elif col == len(self._data[0]) - 1 and value == "":
-                        removed_col = False
-                        if row < len(self._data):
-                            self._data[row][col] = ''
-                        for c in range(col, -1, -1):
-                            if all(_row[c] == "" for _row in self._data):
-                                removed_col = True
-                                for r in self._data:
-                                    r.pop(c)
-                                self._columnWidths.pop(c)
-                                self._roles.pop(c)
-                        if removed_col:
-                            index = self.index(0, len(self._data[0]))
-                            index2 = self.index(self._rows_nb - 1, col)
-                            self.dataChanged.emit(index, index2, [Qt.BackgroundRole])
-                            if prev_role != RoleTypes.NAMES:
-                                self.signal.emit({"type": "selected_cell_changed", "value": self._role_types.index(RoleTypes.NAMES)})
-                elif self._roles:
-                    self._columnWidths = []
-                    index = self.index(0, 0)
-                    index2 = self.index(self._rows_nb - 1, prev_col_nb)
-                    self.dataChanged.emit(index, index2, [Qt.BackgroundRole])
-                    self._roles = []
-                    if prev_role != RoleTypes.NAMES:
-                        self.signal.emit({"type": "selected_cell_changed", "value": self._role_types.index(RoleTypes.NAMES)})
-                if row < len(self._data) and col < len(self._data[0]):
-                    self._data[row][col] = value
-                self.verticalScroll(self._verticalScrollPosition, self._verticalScrollSize, self._tableViewContentY, self._tableViewHeight)
-                self.horizontalScroll(self._horizontalScrollPosition, self._horizontalScrollSize, self._tableViewContentX, self._tableViewWidth)
-                index = self.index(row, col)
-                self.dataChanged.emit(index, index, [Qt.EditRole, Qt.DisplayRole])
-            self._appendChecking()
+            self._setCells([(index.row(), index.column(), value)], index.column())
             return True
         return False
 
@@ -425,10 +446,10 @@ class SpreadsheetModel(QAbstractTableModel):
         else:
             sizeToReach = tableViewContentX + tableViewWidth
             if self._data and sizeToReach < self._columnWidths[-1]:
-                requiredColumns = len(self._data[0])
+                requiredColumns = self._data.column_count
             else:
                 prevWidth = self._columnWidths[-1] if self._data else 0
-                requiredColumns = (len(self._data[0]) if self._data else 0) + (sizeToReach - prevWidth) // self.columnWidth(-1) + 1
+                requiredColumns = self._data.column_count + (sizeToReach - prevWidth) // self.columnWidth(-1) + 1
             if requiredColumns != self._columns_nb:
                 self.setColumns(requiredColumns)
 
@@ -438,7 +459,7 @@ class SpreadsheetModel(QAbstractTableModel):
 
     @Slot(result=int)
     def getMaxColumn(self):
-        return (len(self._data[0]) if self._data else 0)
+        return self._data.column_count
 
     def roleNames(self):
         roles = super().roleNames()
@@ -465,10 +486,12 @@ class SpreadsheetModel(QAbstractTableModel):
     @Slot(bool)
     def sortButton(self, reorder):
         with self.condition:
-            for i, task in enumerate(self._collections.sortings_list):
+            # The new sort replaces the running or queued one of the same collection
+            self._cancelRunningTask(self._collections.sortings_list)
+            for i, task in enumerate(self._collections.sortings_list[1:], start=1):
                 if task["collectionName"] == self.collectionName:
                     del self._collections.sortings_list[i]
-                    return
+                    break
             task_object = {"collectionName": self.collectionName, "id": random.random(), "reorder": reorder}
             self._collections.sortings_list.insert(bool(self._collections.sortings_list), task_object)
             self.condition.notify_all()
@@ -496,7 +519,7 @@ class SpreadsheetModel(QAbstractTableModel):
                 # Collect valid media URLs
                 media_urls = []
                 for i in range(len(self._data)):
-                    path = self._data[i][url_col]
+                    path = self._data.get(i, url_col)
                     if path and os.path.exists(os.path.join(MEDIA_ROOT, path)):
                         full_path = os.path.join(MEDIA_ROOT, path)
                         full_path = os.path.normpath(full_path)
@@ -540,21 +563,12 @@ class SpreadsheetModel(QAbstractTableModel):
     
     @Slot(int, int, list)
     def setBlockData(self, start_row, start_col, data):
-        """Set a block of cells starting at given position"""
-        if not data:
+        """Set a block of cells starting at given position, checked and saved once"""
+        if start_row < 0 or start_col < 0:
             return
-
-        for r, row_data in enumerate(data):
-            for c, value in enumerate(row_data):
-                self.setData(
-                    self.index(start_row + r, start_col + c),
-                    value,
-                    Qt.EditRole
-                )
-
-        max_cols = max(len(row) for row in data)
-        top_left = self.index(start_row, start_col)
-        bottom_right = self.index(start_row + len(data) - 1, start_col + max_cols - 1)
-        self.dataChanged.emit(top_left, bottom_right, [Qt.DisplayRole])
-            
-        self._appendChecking()
\ No newline at end of file
+        cells = [
+            (start_row + r, start_col + c, value)
+            for r, row_data in enumerate(data)
+            for c, value in enumerate(row_data)
+        ]
+        self._setCells(cells, self._selected_column)
\ No newline at end of file
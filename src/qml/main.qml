@@ -32,6 +32,12 @@ Window {
                 case "FloatingWindow_text_changed":
                     floatingWindow.errorTextItem.text = data.value;
                     break;
+                case "validation_issue":
+                    console.debug("Validation " + data.value.level, "in", data.collectionName, "at row", data.value.row, "column", data.value.column + ":", data.value.message);
+                    break;
+                case "solver_stats":
+                    console.debug("Solver stats for", data.collectionName + ":", JSON.stringify(data.value));
+                    break;
                 case "selected_cell_changed":
                     floatingWindow.roleComboBox.currentIndex = data.value;
                     break;
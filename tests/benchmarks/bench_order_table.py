@@ -0,0 +1,90 @@
+"""
+Benchmark of order_table, the step that rewrites the row numbers of a table after sorting.
+
+Run from the root of the project:
+
+    python -m tests.benchmarks.bench_order_table
+    python -m tests.benchmarks.bench_order_table --rows 1000 4000 16000 64000 --shapes after window distance
+
+Every case reorders a synthetic table (see bench_sorter.make_table) along a random
+permutation and appends one JSON line to the output file (bench_output.txt by default).
+The time per cell should not grow with the size of the table: the slope of the time
+against the number of cells on a log-log scale, printed at the end, is close to 1 when
+order_table scales linearly.
+"""
+import argparse
+import copy
+import json
+import math
+import random
+import statistics
+import time
+from typing import List
+
+from src.models.generate_sortings import order_table
+from tests.benchmarks.bench_sorter import SHAPES, make_table, previous_results
+
+
+def loglog_slope(sizes: List[int], times: List[float]) -> float:
+    """Least squares slope of log(times) against log(sizes)."""
+    xs = [math.log(size) for size in sizes]
+    ys = [math.log(seconds) for seconds in times]
+    x_mean = statistics.fmean(xs)
+    y_mean = statistics.fmean(ys)
+    return sum((x - x_mean) * (y - y_mean) for x, y in zip(xs, ys)) / sum((x - x_mean) ** 2 for x in xs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark order_table() on synthetic tables.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 4000, 16000, 64000])
+    parser.add_argument("--pointer-depth", type=int, default=2)
+    parser.add_argument("--groups", type=int, default=10, help="group rows per pointer level")
+    parser.add_argument("--density", type=float, default=0.5, help="fraction of rows with an instruction per dependency column")
+    parser.add_argument("--shapes", nargs="+", default=["after", "window", "distance"], choices=sorted(SHAPES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench_output.txt")
+    args = parser.parse_args()
+
+    previous = previous_results(args.output)
+    sizes = []
+    times = []
+    with open(args.output, "a", encoding="utf-8") as out:
+        for rows in args.rows:
+            config = {
+                "rows": rows,
+                "pointer_depth": args.pointer_depth,
+                "groups": args.groups,
+                "dependency_density": args.density,
+                "shapes": tuple(args.shapes),
+                "seed": args.seed,
+            }
+            table, roles = make_table(**config)
+            rng = random.Random(args.seed)
+            res = [0] + rng.sample(range(1, len(table)), len(table) - 1)
+            dep_pattern = [cell.split('.') for cell in table[0]]
+            cells = sum(1 for row in table[1:] for cell in row if cell)
+            runs = []
+            for _ in range(args.repeat):
+                table_copy = copy.deepcopy(table)
+                start = time.perf_counter()
+                order_table(res, table_copy, roles, dep_pattern)
+                runs.append(time.perf_counter() - start)
+            seconds = statistics.median(runs)
+            sizes.append(cells)
+            times.append(seconds)
+
+            case = "order_table " + " ".join(f"{key}={value}" for key, value in config.items())
+            record = {"case": case, "time": time.strftime("%Y-%m-%d %H:%M:%S"), "repeat": args.repeat,
+                      "total": seconds, "cells": cells}
+            out.write(json.dumps(record) + "\n")
+
+            line = f"{rows:>7} rows, {cells:>8} cells: {seconds * 1000:9.1f}ms, {seconds / cells * 1e6:.2f}us per cell"
+            if case in previous:
+                line += f", previously {previous[case]['total'] * 1000:.1f}ms"
+            print(line)
+    if len(sizes) > 1:
+        print(f"log-log slope of time against cells: {loglog_slope(sizes, times):.2f} (1 is linear)")
+
+if __name__ == "__main__":
+    main()
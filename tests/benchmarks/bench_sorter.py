@@ -0,0 +1,182 @@
+"""
+Benchmarks of the sorting pipeline on synthetic spreadsheets.
+
+Run from the root of the project:
+
+    python -m tests.benchmarks.bench_sorter
+    python -m tests.benchmarks.bench_sorter --rows 100 400 --shapes after window --repeat 5
+    python -m tests.benchmarks.bench_sorter --solvers backtracking propagation cpsat
+
+Every case times sorter() end to end and each of its phases, and appends one JSON
+line per case to the output file (bench_output.txt by default). When the file already
+holds a result for the same case, the new median is printed next to the previous one.
+"""
+import argparse
+import copy
+import json
+import random
+import statistics
+import time
+from typing import Dict, List, Tuple
+
+from src.models.generate_sortings import sorter
+from src.models.solver_stats import SolverStats
+
+ROLES = ["names", "path", "sprawl", "pointers"]
+
+# Header of the dependencies column of each interval shape, and which rows a
+# dependency of that shape may target, given the rank of both rows in the hidden order.
+SHAPES = {
+    # after the target
+    "after": ("_|.|", lambda rank, target: target < rank),
+    # before the target
+    "before": ("|.|_", lambda rank, target: target > rank),
+    # at most 5 rows after the target
+    "window": ("_|.|1:5_", lambda rank, target: rank - 5 <= target < rank),
+    # not in the 2 rows following the target
+    "gap": ("|.|_3", lambda rank, target: not rank - 2 <= target < rank),
+    # as far as possible from the target
+    "distance": ("as far as possible from .", lambda rank, target: target != rank),
+}
+
+
+def make_table(rows: int, pointer_depth: int = 1, groups: int = 10, attributes: int = 5,
+               attributes_per_row: int = 1, dependency_density: float = 0.3,
+               shapes: Tuple[str, ...] = ("after", "window"), seed: int = 0) -> Tuple[List[List[str]], List[str]]:
+    """
+    Synthetic table of `rows` media rows, plus `groups` rows without path per pointer level
+    forming chains `pointer_depth` deep. Media rows point to a group of the first level with
+    probability 1/2 and carry `attributes_per_row` sprawl attributes out of `attributes`.
+    Every dependency column (one per shape) gets an instruction in a fraction
+    `dependency_density` of the media rows, a row number or a name, always consistent with
+    a hidden order of the media rows so that the table can be sorted.
+    Returns the table (pattern header first) and its roles.
+    """
+    rng = random.Random(seed)
+    roles = ROLES + ["dependencies"] * len(shapes)
+    header = [""] * len(ROLES) + [SHAPES[shape][0] for shape in shapes]
+
+    # Group rows come first; rows of a level point to rows of the next level
+    table = [header]
+    level_rows = []
+    for level in range(pointer_depth):
+        level_rows.append(list(range(len(table), len(table) + groups)))
+        for g in range(groups):
+            row = [f"group{level}_{g}", "", "", ""] + [""] * len(shapes)
+            if rng.random() < 0.5:
+                row[2] = f"attr{rng.randrange(attributes)}"
+            table.append(row)
+    for level in range(pointer_depth - 1):
+        for row_index in level_rows[level]:
+            table[row_index][3] = str(rng.choice(level_rows[level + 1]))
+
+    media_rows = list(range(len(table), len(table) + rows))
+    rank = {row_index: r for r, row_index in enumerate(rng.sample(media_rows, rows))}
+    by_rank = sorted(media_rows, key=rank.get)
+    for row_index in media_rows:
+        row = [f"item{row_index}", f"file://item{row_index}.png", "", ""] + [""] * len(shapes)
+        row[2] = ";".join(sorted({f"attr{rng.randrange(attributes)}" for _ in range(attributes_per_row)}))
+        if pointer_depth and rng.random() < 0.5:
+            row[3] = str(rng.choice(level_rows[0]))
+        table.append(row)
+
+    for column, shape in enumerate(shapes, start=len(ROLES)):
+        allowed = SHAPES[shape][1]
+        for row_index in media_rows:
+            if rng.random() >= dependency_density:
+                continue
+            # Sample a few candidates rather than scanning every row
+            for _ in range(8):
+                target = by_rank[rng.randrange(rows)]
+                if allowed(rank[row_index], rank[target]):
+                    break
+            else:
+                continue
+            table[row_index][column] = str(target) if rng.random() < 0.8 else table[target][0]
+    return table, roles
+
+
+def run_case(table: List[List[str]], roles: List[str], repeat: int, solve_options: Dict) -> Dict:
+    """Median wall time of sorter() and of each of its phases over `repeat` runs."""
+    totals = []
+    phases: Dict[str, List[float]] = {}
+    errors = []
+    for run in range(repeat):
+        stats = SolverStats()
+        errors = []
+        random.seed(run)
+        start = time.perf_counter()
+        sorter(copy.deepcopy(table), roles, errors, [], stats, solve_options)
+        totals.append(time.perf_counter() - start)
+        for name, seconds in stats.phase_times.items():
+            phases.setdefault(name, []).append(seconds)
+    return {
+        "total": statistics.median(totals),
+        "phases": {name: statistics.median(times) for name, times in phases.items()},
+        "nodes": stats.nodes,
+        "constraint_checks": stats.constraint_checks,
+        "errors": errors,
+    }
+
+
+def previous_results(path: str) -> Dict[str, Dict]:
+    """Last recorded result of every case in the output file."""
+    results = {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    results[record["case"]] = record
+    except FileNotFoundError:
+        pass
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sorter() on synthetic tables.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[50, 200, 500])
+    parser.add_argument("--pointer-depth", type=int, default=2)
+    parser.add_argument("--groups", type=int, default=10, help="group rows per pointer level")
+    parser.add_argument("--attributes", type=int, default=8, help="distinct sprawl attributes")
+    parser.add_argument("--attributes-per-row", type=int, default=1)
+    parser.add_argument("--density", type=float, default=0.3, help="fraction of rows with an instruction per dependency column")
+    parser.add_argument("--shapes", nargs="+", default=["after", "window"], choices=sorted(SHAPES))
+    # By default the solver of the application, which sorts without a solver option
+    parser.add_argument("--solvers", nargs="+", default=["backtracking"], choices=["backtracking", "propagation", "cpsat"])
+    parser.add_argument("--time-limit", type=float, default=10.0, help="seconds per solve")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench_output.txt")
+    args = parser.parse_args()
+
+    previous = previous_results(args.output)
+    with open(args.output, "a", encoding="utf-8") as out:
+        for rows in args.rows:
+            config = {
+                "rows": rows,
+                "pointer_depth": args.pointer_depth,
+                "groups": args.groups,
+                "attributes": args.attributes,
+                "attributes_per_row": args.attributes_per_row,
+                "dependency_density": args.density,
+                "shapes": tuple(args.shapes),
+                "seed": args.seed,
+            }
+            table, roles = make_table(**config)
+            for solver in args.solvers:
+                case = f"sorter solver={solver} time_limit={args.time_limit} " + " ".join(f"{key}={value}" for key, value in config.items())
+                result = run_case(table, roles, args.repeat, {"solver": solver, "time_limit": args.time_limit})
+                record = {"case": case, "time": time.strftime("%Y-%m-%d %H:%M:%S"), "repeat": args.repeat, **result}
+                out.write(json.dumps(record) + "\n")
+
+                phases = ", ".join(f"{name} {seconds * 1000:.1f}ms" for name, seconds in result["phases"].items())
+                line = f"{rows:>6} rows, {solver}: {result['total'] * 1000:9.1f}ms ({phases})"
+                if case in previous:
+                    line += f", previously {previous[case]['total'] * 1000:.1f}ms"
+                if result["errors"]:
+                    line += f", errors: {result['errors']}"
+                print(line)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import itertools
+import math
+import random
+import time
+
+import pytest
+
+from src.models.generate_sortings import ConstraintSorter, _SearchLimits
+
+
+def spread_out(n, m):
+    """
+    `m` of `n` elements that cannot be next to one another: unsatisfiable when m > (n + 1) // 2,
+    which the search only finds out after placing most of them.
+    """
+    sorter = ConstraintSorter([str(i) for i in range(n)])
+    for i in range(m):
+        for j in range(m):
+            if i != j:
+                sorter.add_forbidden_constraint(str(i), str(j), [(-1, 1)])
+    return sorter
+
+
+def test_restarts_share_the_time_limit_and_report_it():
+    sorter = spread_out(16, 10)
+    start = time.perf_counter()
+    # Three times more restarts than workers
+    assert sorter.solve(restarts=6, workers=2, time_limit=1.0) is None
+    assert time.perf_counter() - start < 2.5
+    assert "gave up" in sorter.last_violations[0] and "time limit" in sorter.last_violations[0]
+
+
+def test_restarts_report_unsatisfiable_tables():
+    sorter = spread_out(5, 4)
+    assert sorter.solve(restarts=4, workers=2) is None
+    assert sorter.last_violations == ["No valid arrangement could be found by the backtracking solver."]
+
+
+INTERVALS = [[(-1, 1)], [(1, math.inf)], [(-math.inf, -1)], [(-2, -2)], [(2, 3), (-3, -2)]]
+
+
+def random_problem(rng, n):
+    """Random constraints over the labels "0" to str(n - 1), as plain tuples."""
+    labels = [str(i) for i in range(n)]
+    forbidden = [(*rng.sample(labels, 2), rng.choice(INTERVALS)) for _ in range(rng.randint(0, 3))]
+    disjunctive = []
+    for _ in range(rng.randint(0, 2)):
+        x, *ys = rng.sample(labels, rng.randint(2, min(n, 4)))
+        disjunctive.append((x, ys, rng.choice(INTERVALS)))
+    pairs = [tuple(rng.sample(labels, 2)) for _ in range(rng.randint(0, 2))]
+    groups = [set(rng.sample(range(n), rng.randint(2, n))) for _ in range(rng.randint(0, 2))]
+    return labels, forbidden, disjunctive, pairs, groups
+
+
+def build(problem):
+    labels, forbidden, disjunctive, pairs, groups = problem
+    sorter = ConstraintSorter(list(labels))
+    for x, y, intervals in forbidden:
+        sorter.add_forbidden_constraint(x, y, intervals)
+    for x, ys, intervals in disjunctive:
+        sorter.add_forbidden_constraint_any_y(x, ys, intervals)
+    for x, y in pairs:
+        sorter.add_maximize_distance_constraint(x, y)
+    for group in groups:
+        sorter.add_group_maximize(group)
+    return sorter
+
+
+def brute_force_valid(problem, arrangement):
+    """Hard constraints of a full arrangement, checked as the original sorter did."""
+    _, forbidden, disjunctive, _, _ = problem
+    pos = {elem: i for i, elem in enumerate(arrangement)}
+    for x, y, intervals in forbidden:
+        if any(start <= pos[x] - pos[y] <= end for start, end in intervals):
+            return False
+    for x, ys, intervals in disjunctive:
+        if all(any(start <= pos[x] - pos[y] <= end for start, end in intervals) for y in ys):
+            return False
+    return True
+
+
+def brute_force_score(problem, arrangement):
+    """Distance score of the original sorter, with every group expanded into pairs."""
+    labels, _, _, pairs, groups = problem
+    pos = {elem: i for i, elem in enumerate(arrangement)}
+    pairs = list(pairs) + [(labels[u], labels[v]) for group in groups for u, v in itertools.combinations(sorted(group), 2)]
+    return sum(abs(pos[x] - pos[y]) for x, y in pairs)
+
+
+def problems(count, sizes=range(2, 7)):
+    rng = random.Random(count)
+    return [random_problem(rng, rng.choice(sizes)) for _ in range(count)]
+
+
+@pytest.mark.parametrize("problem", problems(40))
+def test_checks_and_scores_match_brute_force(problem):
+    sorter = build(problem)
+    for arrangement in itertools.permutations(problem[0]):
+        assert sorter.is_valid_placement(list(arrangement)) == brute_force_valid(problem, arrangement)
+        assert sorter.calculate_distance_score(list(arrangement)) == brute_force_score(problem, arrangement)
+
+
+@pytest.mark.parametrize("solver", ["backtracking", "propagation"])
+@pytest.mark.parametrize("optimizer", ["hill_climbing", "annealing"])
+@pytest.mark.parametrize("problem", problems(40))
+def test_solvers_find_valid_arrangements_exactly_when_one_exists(problem, solver, optimizer):
+    random.seed(0)
+    satisfiable = any(brute_force_valid(problem, arrangement) for arrangement in itertools.permutations(problem[0]))
+    sorter = build(problem)
+    result = sorter.solve(solver=solver, optimizer=optimizer, time_limit=0.2)
+    if solver == "backtracking" and problem[2] and result is None:
+        # As in the original sorter, backtracking checks a disjunctive constraint as soon as one
+        # of its y is placed, which can cut off valid arrangements: it only has to be right
+        satisfiable = False
+    if satisfiable:
+        assert sorted(result) == sorted(problem[0])
+        assert brute_force_valid(problem, result)
+    else:
+        assert result is None
+        assert sorter.last_violations == [f"No valid arrangement could be found by the {solver} solver."]
+
+
+@pytest.mark.parametrize("problem", problems(20))
+def test_cpsat_finds_the_best_score(problem):
+    pytest.importorskip("ortools")
+    valid = [arrangement for arrangement in itertools.permutations(problem[0]) if brute_force_valid(problem, arrangement)]
+    result = build(problem).solve(solver="cpsat", workers=1, time_limit=5.0)
+    if not valid:
+        assert result is None
+    else:
+        assert brute_force_valid(problem, result)
+        assert brute_force_score(problem, result) == max(brute_force_score(problem, arrangement) for arrangement in valid)
+
+
+# One element, which has no other element to be swapped with
+SINGLE_ELEMENT = [(["0"], [], [], [], []), (["0"], [], [("0", ["0"], [(-math.inf, math.inf)])], [], [])]
+
+
+@pytest.mark.parametrize("problem", problems(40) + SINGLE_ELEMENT)
+def test_repair_returns_valid_arrangements(problem):
+    rng = random.Random(0)
+    random.seed(0)
+    sorter = build(problem)
+    n = len(problem[0])
+    for _ in range(10):
+        arrangement = rng.sample(range(n), n)
+        was_valid = brute_force_valid(problem, [str(i) for i in arrangement])
+        repaired = sorter._repair(list(arrangement), _SearchLimits())
+        if was_valid:
+            # Nothing to repair
+            assert repaired == arrangement
+        elif repaired is not None:
+            assert sorted(repaired) == list(range(n))
+            assert brute_force_valid(problem, [str(i) for i in repaired])
+
+
+def test_single_element_that_cannot_be_placed_is_reported():
+    sorter = build(SINGLE_ELEMENT[1])
+    assert sorter.solve(initial=["0"]) is None
+    assert sorter.last_violations == ["No valid arrangement could be found by the backtracking solver."]
@@ -0,0 +1,101 @@
+import pickle
+import random
+
+import pytest
+
+from src.models.data_structures import CellStore, collectionElement
+
+
+def check(store, reference):
+    """The store holds the same cells as `reference`, a plain list of rows."""
+    assert len(store) == len(reference)
+    assert store.rows() == reference
+    columns = len(reference[0]) if reference else 0
+    assert store.column_count == columns
+    for i, row in enumerate(reference):
+        assert store.is_row_empty(i) == (not any(row))
+        for j, value in enumerate(row):
+            assert store.get(i, j) == value
+    for j in range(columns):
+        assert store.is_column_empty(j) == (not any(row[j] for row in reference))
+    assert store.get(len(reference), 0) == "" and store.get(0, columns) == "" and store.get(-1, 0) == ""
+
+
+def random_value(rng):
+    return rng.choice(["", "", "a", "b", "long value"])
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_random_edits_match_list_of_rows(seed):
+    rng = random.Random(seed)
+    reference = [[random_value(rng) for _ in range(3)] for _ in range(4)]
+    store = CellStore(reference)
+    check(store, reference)
+    for _ in range(60):
+        op = rng.choice(["set", "set", "set", "set_rows", "add_rows", "add_columns", "remove_rows", "remove_columns", "pickle"])
+        if op == "set" and reference:
+            i, j = rng.randrange(len(reference)), rng.randrange(len(reference[0]))
+            reference[i][j] = random_value(rng)
+            store.set(i, j, reference[i][j])
+        elif op == "set_rows" and reference:
+            start = rng.randint(0, len(reference))
+            rows = [[random_value(rng) for _ in range(len(reference[0]) + rng.randint(0, 1))] for _ in range(rng.randint(0, 3))]
+            reference[start:] = [row[:len(reference[0])] for row in rows]
+            store.set_rows(start, rows)
+        elif op == "add_rows" and reference:
+            count = rng.randint(1, 3)
+            reference.extend([""] * len(reference[0]) for _ in range(count))
+            store.add_rows(count)
+        elif op == "add_columns" and reference:
+            count = rng.randint(1, 2)
+            for row in reference:
+                row.extend([""] * count)
+            store.add_columns(count)
+        elif op == "remove_rows":
+            expected = [i for i, row in enumerate(reference) if not any(row)][::-1]
+            assert store.remove_empty_rows() == expected
+            reference = [row for row in reference if any(row)]
+        elif op == "remove_columns" and reference:
+            expected = [j for j in range(len(reference[0])) if not any(row[j] for row in reference)][::-1]
+            assert store.remove_empty_columns() == expected
+            for j in expected:
+                for row in reference:
+                    del row[j]
+        elif op == "pickle":
+            store = pickle.loads(pickle.dumps(store))
+            check(store, reference)
+            continue
+        else:
+            continue
+        check(store, reference)
+
+
+def test_edits_change_the_version():
+    store = CellStore([["a", ""], ["", ""]])
+    versions = [store.version]
+    for edit in (lambda: store.set(0, 1, "b"), lambda: store.set_rows(1, [["c"]]), lambda: store.add_rows(1),
+                 lambda: store.add_columns(1), store.remove_empty_rows, store.remove_empty_columns):
+        edit()
+        versions.append(store.version)
+    assert len(set(versions)) == len(versions)
+    # Nothing to remove, nothing changed
+    store.remove_empty_rows()
+    assert store.version == versions[-1]
+
+
+def test_set_outside_of_the_store_fails():
+    store = CellStore([["a"]])
+    with pytest.raises(IndexError):
+        store.set(1, 0, "b")
+    with pytest.raises(IndexError):
+        store.set(0, 1, "b")
+
+
+def test_collection_saved_as_list_of_rows_is_loaded():
+    element = collectionElement([20], [80])
+    element.data = [["names", "path"], ["a", ""]]
+    # Pickle the old layout, with a list of rows instead of a store
+    loaded = pickle.loads(pickle.dumps(element))
+    assert isinstance(loaded.data, CellStore)
+    assert loaded.data.rows() == [["names", "path"], ["a", ""]]
+    assert loaded.rowHeights == [20]
@@ -0,0 +1,42 @@
+import random
+
+import pytest
+
+from src.models.generate_sortings import find_cycles
+
+
+def brute_force_cycles(graph):
+    """Groups of nodes reaching each other, and nodes reaching themselves, from the reachability of every node."""
+    reach = []
+    for start in range(len(graph)):
+        seen = set()
+        to_visit = list(graph[start])
+        while to_visit:
+            node = to_visit.pop()
+            if node not in seen:
+                seen.add(node)
+                to_visit.extend(graph[node])
+        reach.append(seen)
+    cycles = set()
+    for i in range(len(graph)):
+        if i in reach[i]:
+            cycles.add(tuple(sorted(j for j in range(len(graph)) if j in reach[i] and i in reach[j])))
+    return cycles
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_cycles_match_brute_force(seed):
+    rng = random.Random(seed)
+    n = rng.randint(1, 12)
+    edges = rng.choice([0.05, 0.1, 0.2, 0.4])
+    graph = [[j for j in range(n) if rng.random() < edges] for _ in range(n)]
+    cycles = find_cycles(graph)
+    assert len(cycles) == len({tuple(cycle) for cycle in cycles})
+    assert {tuple(cycle) for cycle in cycles} == brute_force_cycles(graph)
+
+
+def test_long_chain_does_not_hit_the_recursion_limit():
+    n = 100000
+    graph = [[i + 1] for i in range(n - 1)] + [[n // 2]]
+    assert find_cycles(graph) == [list(range(n // 2, n))]
+    assert find_cycles(graph[:-1] + [[]]) == []
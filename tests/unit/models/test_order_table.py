@@ -0,0 +1,65 @@
+import random
+
+import pytest
+
+from src.models.dependency_parser import parse_instruction
+from src.models.generate_sortings import order_table
+
+ROLES = ["names", "dependencies", "dependencies", "dependencies", "pointers"]
+HEADER = ["", "_|.|", "as far as possible from .", ".", ""]
+
+
+def random_table(rng, n):
+    """Rows whose dependencies and pointers target other rows by number or by name."""
+    table = [list(HEADER)]
+    for i in range(1, n + 1):
+        def target():
+            return rng.choice([str(rng.randint(1, n)), f"row{rng.randint(1, n)}"])
+        row = [f"row{i}", "", "", "", ""]
+        if rng.random() < 0.7:
+            row[1] = ";".join(rng.choice(["", "any"]) + target() for _ in range(rng.randint(1, 2)))
+        if rng.random() < 0.5:
+            row[2] = target()
+        if rng.random() < 0.5:
+            row[3] = f"_|{target()}|1:5_"
+        if rng.random() < 0.5:
+            row[4] = ";".join(target() for _ in range(rng.randint(1, 2)))
+        table.append(row)
+    return table
+
+
+def targets(table):
+    """The rows each cell refers to, by name, in the order they are written."""
+    patterns = [tuple(cell.split('.')) for cell in table[0]]
+    result = []
+    for row in table[1:]:
+        row_targets = []
+        for j, cell in enumerate(row):
+            for instr in cell.split(';') if cell and ROLES[j] != "names" else []:
+                if ROLES[j] == "pointers":
+                    row_targets.append(table[int(instr)][0] if instr.isdigit() else instr)
+                else:
+                    parsed = parse_instruction(patterns[j], instr)
+                    row_targets.append(table[parsed.number][0] if parsed.number is not None else parsed.name)
+        result.append((row[0], row_targets))
+    return result
+
+
+@pytest.mark.parametrize("seed", range(100))
+def test_references_follow_their_rows(seed):
+    rng = random.Random(seed)
+    table = random_table(rng, rng.randint(1, 15))
+    original = [list(row) for row in table]
+    res = [0] + rng.sample(range(1, len(table)), len(table) - 1)
+    new_table = order_table(res, table, ROLES, [cell.split('.') for cell in table[0]])
+    assert table == original
+    assert new_table[0] == table[0]
+    assert sorted(targets(new_table)) == sorted(targets(table))
+    assert [row[0] for row in new_table[1:]] == [table[i][0] for i in res[1:]]
+
+
+def test_numbers_of_the_pattern_are_kept():
+    table = [["", "as far as possible from 1."], ["a", "2"], ["b", ""]]
+    new_table = order_table([0, 2, 1], table, ["names", "dependencies"], [cell.split('.') for cell in table[0]])
+    # The row number starts in the pattern, so it cannot be rewritten in the cell
+    assert new_table[2] == ["a", "2"]
@@ -0,0 +1,28 @@
+import time
+
+from src.models.solution_cache import CachedSolution, SolutionCache
+
+
+def test_entries_are_saved_once_after_the_delay(tmp_path):
+    path = tmp_path / "solutions.pickle"
+    cache = SolutionCache(path=str(path), save_delay=0.2)
+    for i in range(10):
+        cache.put(str(i), CachedSolution([]))
+    # Nothing is written by put itself
+    assert not path.exists()
+    time.sleep(0.5)
+    assert path.exists()
+    modified = path.stat().st_mtime_ns
+    time.sleep(0.3)
+    assert path.stat().st_mtime_ns == modified
+    assert len(SolutionCache(path=str(path))) == 10
+
+
+def test_flush_writes_pending_entries(tmp_path):
+    path = tmp_path / "solutions.pickle"
+    cache = SolutionCache(max_entries=2, path=str(path), save_delay=60)
+    for i in range(3):
+        cache.put(str(i), CachedSolution([]))
+    cache.flush()
+    reloaded = SolutionCache(path=str(path))
+    assert reloaded.get("0") is None and reloaded.get("2") is not None
@@ -0,0 +1,132 @@
+import random
+
+from src.models.generate_sortings import SortSession, find_valid_sortings, order_table, sort_order
+
+ROLES = ["names", "path", "sprawl"]
+
+
+def clumped_table():
+    """Rows with only attributes to sprawl, each attribute on consecutive rows."""
+    table = [["", "", ""]]
+    for i, cat in enumerate("xxxyyyzzz", start=1):
+        table.append([f"row{i}", f"file://row{i}", cat])
+    return table
+
+
+def clumps(table, res):
+    """Consecutive rows sharing their attribute, in the order `res`."""
+    cats = [table[i][2] for i in res[1:]]
+    return sum(a == b for a, b in zip(cats, cats[1:]))
+
+
+def sort(table, session, **solve_options):
+    errors, warnings = [], []
+    res = sort_order([list(row) for row in table], ROLES, errors, warnings, session=session,
+                     solve_options={"keep_valid_initial": True, **solve_options})
+    assert not errors
+    return res
+
+
+def test_valid_order_of_new_table_is_optimized():
+    random.seed(0)
+    table = clumped_table()
+    res = sort(table, SortSession())
+    assert res != list(range(len(table)))
+    assert clumps(table, res) < clumps(table, range(len(table)))
+
+
+def test_order_kept_while_table_unchanged_since_optimized():
+    random.seed(0)
+    table = clumped_table()
+    session = SortSession()
+    res = sort(table, session)
+    sorted_table = order_table(res, table, ROLES, [cell.split('.') for cell in table[0]])
+    session.mark_optimized(sorted_table, ROLES)
+    assert sort(sorted_table, session) == list(range(len(table)))
+
+
+def test_order_optimized_again_once_table_changed():
+    random.seed(0)
+    table = clumped_table()
+    session = SortSession()
+    session.mark_optimized(table, ROLES)
+    assert sort(table, session) == list(range(len(table)))
+    table[1][0] = "renamed"
+    res = sort(table, session)
+    assert clumps(table, res) < clumps(table, range(len(table)))
+
+
+def keys(table):
+    return [tuple(row) for row in table]
+
+
+def test_parse_rows_reuses_unchanged_rows():
+    table = clumped_table()
+    session = SortSession()
+    first = session.parse_rows(keys(table), ROLES, [()] * len(ROLES))
+    assert session.reparsed_rows == len(table) - 1
+    table[4][2] = "w"
+    second = session.parse_rows(keys(table), ROLES, [()] * len(ROLES))
+    assert session.reparsed_rows == 1
+    assert [a is b for a, b in zip(first[1:], second[1:])] == [i != 4 for i in range(1, len(table))]
+    assert second[4].attributes == [(2, "w")]
+    # Other roles, every row parsed again
+    session.parse_rows(keys(table), ["names", "path", "attributes"], [()] * len(ROLES))
+    assert session.reparsed_rows == len(table) - 1
+
+
+def test_initial_order_follows_previous_ranks():
+    rng = random.Random(0)
+    session = SortSession()
+    assert session.initial_order([("a",)]) is None
+    row_keys = [(f"row{i}",) for i in range(20)]
+    previous = rng.sample(range(20), 20)
+    session.ranks = {row_keys[elem]: rank for rank, elem in enumerate(previous)}
+    # Row 5 was edited and row 21 added
+    row_keys[5] = ("edited",)
+    row_keys.append(("new",))
+    order = session.initial_order(row_keys)
+    assert sorted(order) == list(range(21))
+    kept = [i for i in order if i not in (5, 20)]
+    assert kept == [elem for elem in previous if elem != 5]
+    assert order.index(5) == order.index(4) + 1
+    assert order.index(20) == order.index(19) + 1
+
+
+def chain_table(n):
+    """Rows each after the row before them, given in reverse order."""
+    roles = ["names", "path", "dependencies"]
+    table = [["", "", "_|.|"]]
+    for i in range(1, n + 1):
+        table.append([f"row{i}", f"file://row{i}", str(i + 1) if i < n else ""])
+    return table, roles
+
+
+def follows_dependencies(table, res):
+    position = {old: new for new, old in enumerate(res)}
+    return all(position[int(row[2])] < position[i] for i, row in enumerate(table[1:], start=1) if row[2])
+
+
+def test_sort_after_edit_reparses_one_row_and_stays_valid():
+    random.seed(0)
+    table, roles = chain_table(8)
+    session = SortSession()
+    errors = []
+    res = sort_order([list(row) for row in table], roles, errors, [], session=session)
+    assert not errors and follows_dependencies(table, res)
+    table[3][0] = "renamed"
+    res = sort_order([list(row) for row in table], roles, errors, [], session=session)
+    assert not errors and follows_dependencies(table, res)
+    assert session.reparsed_rows == 1
+
+
+def test_single_row_depending_on_itself_is_reported():
+    result = find_valid_sortings([["", "", "_|.|_"], ["a", "file://a", "any1"]], ["names", "path", "dependencies"])
+    assert isinstance(result, str) and "No valid solution found!" in result
+
+
+def test_sort_prints_nothing(capsys):
+    random.seed(0)
+    table, roles = chain_table(8)
+    assert sort_order(table, roles, [], [])
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,108 @@
+import random
+
+import pytest
+
+from src.models.generate_sortings import ValidationIssue, validate_table
+
+ROLES = ["names", "pointers", "pointers", "path"]
+
+
+def baseline_paths(table):
+    """Path cells after inheritance, as the sorter computed them before validate_table."""
+    table = [list(row) for row in table]
+    pointed_by = [[] for _ in table]
+    for i, row in enumerate(table[1:], start=1):
+        for cell in row[1:3]:
+            if cell:
+                pointed_by[int(cell)].append(i)
+    for i in range(1, len(table)):
+        seen = []
+        to_check = list(pointed_by[i])
+        while to_check:
+            current = to_check.pop()
+            if current not in seen:
+                seen.append(current)
+                if table[i][3]:
+                    table[current][3] = table[i][3]
+            to_check.extend(pointed_by[current])
+    return [row[3] for row in table]
+
+
+def random_pointer_table(rng, n):
+    """Rows pointing to at most two other rows, without cycles."""
+    rank = list(range(1, n + 1))
+    rng.shuffle(rank)
+    table = [["", "", "", ""]]
+    for i in range(1, n + 1):
+        # Only rows later in `rank` can be pointed to, so the pointers cannot loop
+        below = rank[rank.index(i) + 1:]
+        targets = rng.sample(below, min(len(below), rng.choice([0, 0, 1, 1, 2])))
+        targets += [""] * (2 - len(targets))
+        path = f"file://row{i}" if rng.random() < 0.4 else ""
+        table.append([f"row{i}", str(targets[0]), str(targets[1]), path])
+    return table
+
+
+def test_pointer_chain_inherits_the_path_of_its_end():
+    # row 1 points to row 3, which points to row 2
+    table = [
+        ["", "", "", ""],
+        ["a", "3", "", ""],
+        ["c", "", "", "file://c"],
+        ["b", "2", "", "file://b"],
+    ]
+    errors, warnings = [], []
+    validated = validate_table(table, ROLES, errors, warnings)
+    assert not errors
+    assert [row[3] for row in table[1:]] == ["file://c"] * 3
+    assert validated.inherited_paths == {1: "file://c", 3: "file://c"}
+    assert any("row 3" in warning and "path already given" in warning for warning in warnings)
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_inherited_paths_match_baseline(seed):
+    rng = random.Random(seed)
+    table = random_pointer_table(rng, rng.randint(1, 12))
+    expected = baseline_paths(table)
+    errors, warnings = [], []
+    validated = validate_table(table, ROLES, errors, warnings)
+    assert not errors
+    assert [row[3] for row in table] == expected
+    for i, path in validated.inherited_paths.items():
+        assert table[i][3] == path
+
+
+def test_every_error_is_reported_with_its_cell():
+    table = [
+        ["", "", "", ""],
+        ["a", "7", "", "file://a"],
+        ["b", "", "", "file://b"],
+        ["c", "4", "", "file://c"],
+        ["d", "3", "", ""],
+    ]
+    issues = []
+    errors, warnings = [], []
+    assert validate_table(table, ROLES, errors, warnings, on_issue=issues.append) is None
+    # The pointer cycle is reported after the invalid pointer
+    assert len(errors) == 2
+    assert "invalid row 7" in errors[0] and "cycle between rows 3, 4" in errors[1]
+    assert [issue.message for issue in issues if issue.level == "error"] == errors
+    assert ValidationIssue("error", errors[0], 1, 1) in issues
+
+
+def test_messages_name_the_row_of_their_issue():
+    roles = ["names", "pointers", "path", "sprawl", "dependencies"]
+    table = [
+        ["", "", "", "", "_|.|"],
+        ["a", "nobody", "file://a", "x", ""],
+        ["b", "9", "file://b", "x", "1.2"],
+        ["c", "", "file://c", "", "nothing"],
+        ["d", "", " ", ";", "0"],
+    ]
+    issues = []
+    validate_table(table, roles, [], [], on_issue=issues.append)
+    located = [issue for issue in issues if issue.row is not None and " in row " in issue.message]
+    # Issues of the paths, pointers, attributes and dependencies
+    assert len(located) >= 6
+    for issue in located:
+        assert f" in row {issue.row}," in issue.message
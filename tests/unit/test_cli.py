@@ -0,0 +1,86 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+CLI = Path(__file__).resolve().parents[2] / "src" / "cli.py"
+
+# Row 1 comes after row 2 and row 3 after row 1
+GOOD = "names,path,dependencies\n,,_|.|\na,file://a,2\nb,file://b,\nc,file://c,1\n"
+
+
+def run(tmp_path, *args):
+    return subprocess.run([sys.executable, str(CLI), *args, "-o", str(tmp_path / "out"), "--jobs", "2"],
+                          cwd=tmp_path, capture_output=True, text=True)
+
+
+def write(tmp_path, name, text):
+    (tmp_path / name).write_text(text, encoding="utf-8")
+    return name
+
+
+def test_sorted_table_is_written(tmp_path):
+    result = run(tmp_path, write(tmp_path, "good.csv", GOOD))
+    assert result.returncode == 0, result.stderr
+    assert (tmp_path / "out" / "good.csv").read_text().splitlines() == [
+        "names,path,dependencies", ",,_|.|", "b,file://b,", "a,file://a,1", "c,file://c,2"]
+    assert not (tmp_path / "out" / "good.report.txt").exists()
+
+
+def test_collection_with_errors_does_not_stop_the_batch(tmp_path):
+    bad = write(tmp_path, "bad.tsv", "names\tpath\tdependencies\n\t\t_|.|\na\tfile://a\t9\n")
+    result = run(tmp_path, write(tmp_path, "good.csv", GOOD), bad)
+    assert result.returncode == 1
+    assert (tmp_path / "out" / "good.csv").exists()
+    assert not (tmp_path / "out" / "bad.tsv").exists()
+    assert "invalid number" in (tmp_path / "out" / "bad.report.txt").read_text()
+
+
+def test_json_collections_are_sorted_by_name(tmp_path):
+    tables = {
+        "first": {"roles": ["names", "path", "dependencies"], "table": [["", "", "_|.|"], ["a", "file://a", "2"], ["b", "file://b", ""]]},
+        "second": [["names", "path"], ["", ""], ["c", "file://c"]],
+    }
+    result = run(tmp_path, write(tmp_path, "tables.json", json.dumps(tables)), "--collection", "first")
+    assert result.returncode == 0, result.stderr
+    assert json.loads((tmp_path / "out" / "first.json").read_text())["table"][1:] == [["b", "file://b", ""], ["a", "file://a", "1"]]
+    assert not (tmp_path / "out" / "second.json").exists()
+
+
+@pytest.mark.parametrize("name, text", [
+    ("wide.csv", "names,path,dependencies\n,,_|.|\na,file://a,,x\n"),
+    ("wide.json", json.dumps({"roles": ["names", "path"], "table": [["", ""], ["a", "file://a", "x"]]})),
+    ("table.txt", GOOD),
+    ("broken.json", "{"),
+    ("short.csv", "names,path\n"),
+])
+def test_invalid_inputs_are_usage_errors(tmp_path, name, text):
+    result = run(tmp_path, write(tmp_path, "good.csv", GOOD), write(tmp_path, name, text))
+    assert result.returncode == 2
+    assert result.stderr.startswith(f"error: {name}")
+    # Nothing is sorted before every input was read
+    assert not (tmp_path / "out").exists()
+
+
+def test_empty_cells_past_the_roles_are_dropped(tmp_path):
+    result = run(tmp_path, write(tmp_path, "trailing.csv", GOOD.replace("\n", ",,\n").replace(",,\n", "\n", 1)))
+    assert result.returncode == 0, result.stderr
+    assert (tmp_path / "out" / "trailing.csv").read_text().splitlines()[2] == "b,file://b,"
+
+
+def test_missing_collection_is_a_usage_error(tmp_path):
+    result = run(tmp_path, write(tmp_path, "good.csv", GOOD), "--collection", "other")
+    assert result.returncode == 2
+    assert "'other'" in result.stderr
+
+
+def test_unexpected_exception_is_an_error_of_its_collection():
+    # An unknown solve option makes the solver raise TypeError
+    code = ("import json, cli; print(json.dumps(cli.sort_collection(['names', 'path'], [['', ''], ['a', 'file://a']], "
+            "{'no_such_option': 1})[:2]))")
+    result = subprocess.run([sys.executable, "-c", code], cwd=CLI.parent, capture_output=True, text=True, check=True)
+    new_table, errors = json.loads(result.stdout)
+    assert new_table is None
+    assert len(errors) == 1 and errors[0].startswith("Error when sorting: TypeError(")